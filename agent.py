@@ -1,22 +1,62 @@
-import ollama
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from config import BASE_URL, HEADERS, SUBMOLTS
-from utils import log, load_personality, load_memory, save_memory, handle_verification
-from memory_manager import load_long_term_context
+from config import (
+    BASE_URL,
+    HEADERS,
+    SUBMOLTS,
+    DRAFT_POST_COUNT,
+    DRAFT_REPLY_COUNT,
+    TRIAGE_REPLY_SCORE,
+    TRIAGE_MAX_CANDIDATES,
+    DUPLICATE_POLICY,
+    DUPLICATE_MAX_REGENERATIONS,
+    REPLY_BATCH_SIZE,
+    OLLAMA_NUM_PARALLEL
+)
+from utils import (
+    log,
+    load_personality,
+    load_memory,
+    update_memory,
+    set_conversation_status,
+    http_request
+)
+from llm_gateway import ollama_chat, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from triage import triage_conversations
+from social_graph import record_comments, record_reply, author_stats, allies_and_enemies
+from dedup import is_near_duplicate
+from outbox import enqueue, start_publisher
+from drafts import (
+    context_fingerprint,
+    chats_fingerprint,
+    post_draft_count,
+    missing_reply_drafts,
+    store_post_draft,
+    store_reply_draft,
+    take_post_draft,
+    take_reply_draft,
+    prune_reply_drafts
+)
+from memory_manager import load_life_context
 from personality_manager import update_age_only
 
+# Characters kept from each rollup level (life/year/quarter/month) in post prompts
+LIFE_CONTEXT_CHARS_PER_LEVEL = 300
+
 
 def listen_and_learn():
     """Check recent posts for new comments and learn from interactions"""
     memory = load_memory()
     log("Checking Moltbook for replies...")
 
+    known_ids = {c.get('comment_id') for c in memory['conversations']}
+    new_conversations = []
+
     # Check the last 3 posts for new comments
     for post_id in memory.get('my_posts', [])[-3:]:
         try:
-            response = requests.get(f"{BASE_URL}/posts/{post_id}", headers=HEADERS, timeout=10)
+            response = http_request("GET", f"{BASE_URL}/posts/{post_id}", headers=HEADERS, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -29,10 +69,10 @@ def listen_and_learn():
                     content = comment.get('content', '')
 
                     # Check if we've already logged this conversation
-                    existing_ids = [c.get('comment_id') for c in memory['conversations']]
-                    if comment_id not in existing_ids:
+                    if comment_id not in known_ids:
                         log(f"New interaction found from {name}!")
-                        memory['conversations'].append({
+                        known_ids.add(comment_id)
+                        new_conversations.append({
                             "date": str(datetime.now()),
                             "post_id": post_id,
                             "comment_id": comment_id,
@@ -45,19 +85,53 @@ def listen_and_learn():
         except Exception as e:
             log(f"Error processing comments for {post_id}: {e}")
 
-    save_memory(memory)
+    # Keep per-author aggregates current (our own comments show up too)
+    agent_name = load_personality()['name']
+    record_comments([c for c in new_conversations if c['from'] != agent_name])
+    allies, enemies = allies_and_enemies()
+
+    # Merge into freshly loaded memory; the outbox publisher may have
+    # recorded new post IDs while we were polling
+    def merge(memory):
+        memory['conversations'].extend(new_conversations)
+        memory['allies'] = allies
+        memory['enemies'] = enemies
 
+    update_memory(merge)
 
-def generate_and_post():
-    """Let LLM decide whether to reply to a comment or create a new post"""
+
+def generate_and_post(drafting=None):
+    """
+    Decide whether to reply to a comment or create a new post.
+    Comments are triaged locally first; the LLM is only asked when the
+    choice isn't obvious. With REPLY_BATCH_SIZE > 1, a backlog of worthy
+    comments is answered several at a time instead. drafting holds the
+    futures of a speculative fill_draft_cache() run; only the draft for the
+    chosen comment or post is waited on.
+    """
     personality = load_personality()
     memory = load_memory()
 
-    # Get recent unanswered conversations
-    recent_convos = memory['conversations'][-5:] if memory['conversations'] else []
+    # Get unanswered conversations worth replying to, best first
+    candidates, skipped = triage_conversations(memory['conversations'], personality['name'])
+    if skipped:
+        set_conversation_status([c.get('comment_id') for c in skipped], "skipped")
 
     # Step One: Decide whether to reply or create new post
-    if recent_convos:
+    if not candidates:
+        log("No unanswered comments worth a reply.")
+    elif REPLY_BATCH_SIZE > 1 and len(candidates) > 1:
+        # Backlog of worthy comments: clear several this run
+        reply_to_comments(personality, [convo for _, convo in candidates[:REPLY_BATCH_SIZE]], drafting)
+        return
+    elif candidates[0][0] >= TRIAGE_REPLY_SCORE:
+        best = candidates[0][1]
+        log(f"Triage picked {best['from']}'s comment, skipping the decision call.")
+        reply_to_comment(personality, best, drafting)
+        return
+    else:
+        recent_convos = [convo for _, convo in candidates[:TRIAGE_MAX_CANDIDATES]]
+
         # Format conversations for LLM to choose from
         convo_summary = "\n".join([
             f"{i+1}. {c['from']} said: \"{c['text']}\""
@@ -81,7 +155,7 @@ def generate_and_post():
         """
 
         log("Llama 3.2 is deciding what to do...")
-        decision_res = ollama.chat(model='llama3.2:3b', messages=[
+        decision_res = ollama_chat(model='llama3.2:3b', messages=[
             {'role': 'user', 'content': decision_prompt}
         ])
         decision = decision_res['message']['content'].strip().upper()
@@ -91,7 +165,7 @@ def generate_and_post():
             try:
                 reply_index = int(decision.split(":")[1]) - 1
                 if 0 <= reply_index < len(recent_convos):
-                    reply_to_comment(personality, recent_convos[reply_index])
+                    reply_to_comment(personality, recent_convos[reply_index], drafting)
                     return
                 else:
                     log("Invalid comment index, creating new post instead...")
@@ -99,11 +173,87 @@ def generate_and_post():
                 log("Could not parse reply decision, creating new post instead...")
 
     # Default: Create new post
-    create_new_post(personality, memory)
+    create_new_post(personality, memory, drafting)
 
 
-def reply_to_comment(personality, comment):
-    """Reply to a specific comment"""
+def wait_for_draft(drafting, key):
+    """
+    Wait for the speculative draft job for key, but only if it is already
+    running. A job still queued is cancelled so the caller can generate the
+    content straight away at interactive priority.
+    """
+    future = (drafting or {}).get(key)
+    if future is None or future.done() or future.cancel():
+        return
+    log("Waiting for the speculative draft to finish...")
+    future.result()
+
+
+def reply_to_comments(personality, comments, drafting=None):
+    """Generate replies to several comments concurrently, one per Ollama slot"""
+    log(f"Batch mode: replying to {len(comments)} comments...")
+
+    def reply(comment):
+        try:
+            reply_to_comment(personality, comment, drafting)
+        except Exception as e:
+            log(f"Error replying to {comment['from']}: {e}")
+
+    with ThreadPoolExecutor(max_workers=OLLAMA_NUM_PARALLEL) as pool:
+        list(pool.map(reply, comments))
+
+
+def reply_to_comment(personality, comment, drafting=None):
+    """Reply to a specific comment, using a pre-generated draft when one exists"""
+    wait_for_draft(drafting, ("reply", comment.get('comment_id')))
+    fingerprint = context_fingerprint(personality, load_life_context(LIFE_CONTEXT_CHARS_PER_LEVEL))
+    reply_text = take_reply_draft(fingerprint, comment.get('comment_id'))
+    if reply_text:
+        log(f"Using pre-generated reply to {comment['from']}.")
+    else:
+        reply_text = draft_reply(personality, comment)
+
+    log(f"Queueing reply to comment on post {comment['post_id']}...")
+    enqueue(
+        "reply",
+        f"/posts/{comment['post_id']}/comments",
+        {"content": reply_text},
+        meta={"to": comment['from'], "comment_id": comment.get('comment_id')}
+    )
+    set_conversation_status([comment.get('comment_id')], "replied")
+    record_reply(comment['from'])
+
+
+def create_new_post(personality, memory, drafting=None):
+    """Create a new independent post, using a pre-generated draft when one exists"""
+    chats = chats_fingerprint(recent_chats(memory))
+    # Only a draft written from the current recent chats is worth waiting for
+    wait_for_draft(drafting, ("post", chats, 0))
+
+    life_context = load_life_context(LIFE_CONTEXT_CHARS_PER_LEVEL)
+    fingerprint = context_fingerprint(personality, life_context)
+
+    payload = take_post_draft(fingerprint, chats)
+    # Something similar may have been published since the draft was written
+    while payload and is_near_duplicate(payload['content']):
+        log("Discarding pre-generated post: near-duplicate of an earlier post.")
+        payload = take_post_draft(fingerprint, chats)
+
+    if payload:
+        payload.pop('created_at', None)
+        payload.pop('chats', None)
+        log(f"Using pre-generated post. Routing to m/{payload['submolt']}...")
+    else:
+        payload = draft_new_post(personality, memory, life_context)
+        if payload is None:
+            return
+
+    # Published (and recorded in my_posts) by the background outbox publisher
+    enqueue("post", "/posts", payload)
+
+
+def draft_reply(personality, comment, priority=PRIORITY_INTERACTIVE):
+    """Generate reply text for a comment"""
     log(f"Crafting reply to {comment['from']}...")
 
     reply_prompt = f"""
@@ -111,46 +261,51 @@ def reply_to_comment(personality, comment):
     Personality: {personality.get('personality', 'Witty')}.
 
     {comment['from']} commented: "{comment['text']}"
+    {relationship_note(comment['from'])}
 
     Write a witty 200-character reply.
     """
 
-    res = ollama.chat(model='llama3.2:3b', messages=[
+    res = ollama_chat(model='llama3.2:3b', messages=[
         {'role': 'user', 'content': reply_prompt}
-    ])
-    reply_text = res['message']['content']
+    ], priority=priority, cache=False)
+    return res['message']['content']
 
-    log(f"Replying to comment on post {comment['post_id']}...")
 
-    payload = {"content": reply_text}
+def relationship_note(name):
+    """Describe our history with an author for the reply prompt"""
+    stats = author_stats(name)
+    if not stats or stats['interactions'] < 2:
+        return f"This is your first exchange with {name}."
+    return (f"You know {name}: {stats['interactions']} comments so far, "
+            f"relationship: {stats['relationship']}.")
 
-    try:
-        post_res = requests.post(
-            f"{BASE_URL}/posts/{comment['post_id']}/comments",
-            headers=HEADERS,
-            json=payload,
-            timeout=30
-        )
-        if post_res.status_code in [200, 201]:
-            handle_verification(post_res.json())
-            log(f"Reply posted successfully to {comment['from']}!")
-        else:
-            log(f"Reply failed with status {post_res.status_code}")
-    except Exception as e:
-        log(f"Connection error: {e}")
-
-
-def create_new_post(personality, memory):
-    """Create a new independent post"""
-    recent_convo = str(memory['conversations'][-2:]) if memory['conversations'] else "No recent chats."
-
-    # Load long-term memory context
-    long_term = load_long_term_context()
+
+def recent_chats(memory):
+    """
+    The slice of short-term memory new posts are written from. Only who
+    said what: triage statuses and timestamps would change the prompt (and
+    the post-draft fingerprint) without changing the conversation.
+    """
+    if not memory['conversations']:
+        return "No recent chats."
+    return " ".join(
+        f"{c['from']} said: \"{c['text']}\""
+        for c in memory['conversations'][-2:]
+    )
+
+
+def draft_new_post(personality, memory, life_context, priority=PRIORITY_INTERACTIVE):
+    """
+    Generate a new post and return its payload (submolt, title, content),
+    or None when every attempt was a near-duplicate of an earlier post.
+    """
+    recent_convo = recent_chats(memory)
+
+    # Long-term memory context (bounded life/year/quarter/month rollup)
     long_term_context = ""
-    if long_term:
-        # Use the most recent summary
-        recent_summary = long_term[-1]['summary'][:500]  # Limit to 500 chars
-        long_term_context = f"\n\nPast experiences summary: {recent_summary}"
+    if life_context:
+        long_term_context = f"\n\nPast experiences summary:\n{life_context}"
 
     system_prompt = f"""
     You are {personality['name']}. Convictions: {personality.get('stances', [])}.
@@ -159,21 +314,33 @@ def create_new_post(personality, memory):
     Write a 200-character witty post for Moltbook. Do not use hashtags.
     """
 
-    log("Llama 3.2 is crafting a new post...")
-    res = ollama.chat(model='llama3.2:3b', messages=[
-        {'role': 'system', 'content': system_prompt},
-        {'role': 'user', 'content': 'Generate a new independent thought.'}
-    ])
-    thought = res['message']['content']
+    for attempt in range(DUPLICATE_MAX_REGENERATIONS + 1):
+        log("Llama 3.2 is crafting a new post...")
+        # Never cached: a regeneration must be able to produce something new
+        res = ollama_chat(model='llama3.2:3b', messages=[
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': 'Generate a new independent thought.'}
+        ], priority=priority, cache=False)
+        thought = res['message']['content']
+
+        # Checked before the title/classification calls are spent on it
+        if not is_near_duplicate(thought):
+            break
+        log("Draft is a near-duplicate of an earlier post.")
+        if DUPLICATE_POLICY == "skip" or attempt == DUPLICATE_MAX_REGENERATIONS:
+            log("Skipping new post.")
+            return None
 
     # Generate a unique title for this post
     title_prompt = f"Write a short, unique title (5-8 words) for this post: '{thought[:100]}'. Respond with ONLY the title, no quotes."
-    title_res = ollama.chat(model='llama3.2:3b', messages=[{'role': 'user', 'content': title_prompt}])
+    title_res = ollama_chat(model='llama3.2:3b', messages=[{'role': 'user', 'content': title_prompt}],
+                            priority=priority)
     post_title = title_res['message']['content'].strip()
 
     # Pick the submolt
     classification_prompt = f"Based on this text: '{thought}', pick the most relevant ID from: {list(SUBMOLTS.keys())}. Respond ONLY with the single word ID."
-    class_res = ollama.chat(model='llama3.2:3b', messages=[{'role': 'user', 'content': classification_prompt}])
+    class_res = ollama_chat(model='llama3.2:3b', messages=[{'role': 'user', 'content': classification_prompt}],
+                            priority=priority)
     chosen_submolt = class_res['message']['content'].strip().lower()
 
     if chosen_submolt not in SUBMOLTS:
@@ -181,30 +348,75 @@ def create_new_post(personality, memory):
 
     log(f"Post created! Routing to m/{chosen_submolt}...")
 
-    payload = {
+    return {
         "submolt": chosen_submolt,
         "title": post_title,
         "content": thought
     }
 
-    try:
-        post_res = requests.post(f"{BASE_URL}/posts", headers=HEADERS, json=payload, timeout=30)
-        if post_res.status_code in [200, 201]:
-            res_json = post_res.json()
-            handle_verification(res_json)
-            new_post_id = res_json.get('post', {}).get('id')
-            memory['my_posts'].append(new_post_id)
-            save_memory(memory)
-            log("Posted successfully!")
-        else:
-            log(f"Post failed with status {post_res.status_code}")
-    except Exception as e:
-        log(f"Connection error: {e}")
+
+def fill_draft_cache(pool=None):
+    """
+    Pre-generate new-post drafts and replies to the best unanswered comments.
+    Runs alongside network I/O and after publishing, so the next decision
+    can pick finished content instead of waiting on several LLM calls.
+    Given a pool, the jobs are submitted to it and their futures returned,
+    keyed ("reply", comment_id) and ("post", chats, n); otherwise the drafts
+    are generated before returning.
+    """
+    personality = load_personality()
+    memory = load_memory()
+    life_context = load_life_context(LIFE_CONTEXT_CHARS_PER_LEVEL)
+    fingerprint = context_fingerprint(personality, life_context)
+    chats = chats_fingerprint(recent_chats(memory))
+
+    candidates, _ = triage_conversations(memory['conversations'], personality['name'])
+    prune_reply_drafts(fingerprint, {convo.get('comment_id') for _, convo in candidates})
+
+    jobs = []
+    best = [convo for _, convo in candidates[:DRAFT_REPLY_COUNT] if convo.get('comment_id')]
+    missing = missing_reply_drafts(fingerprint, [c['comment_id'] for c in best])
+    for comment in best:
+        if comment['comment_id'] in missing:
+            jobs.append((("reply", comment['comment_id']), lambda comment=comment: store_reply_draft(
+                fingerprint, comment['comment_id'], draft_reply(personality, comment, PRIORITY_BACKGROUND)
+            )))
+
+    for n in range(DRAFT_POST_COUNT - post_draft_count(fingerprint, chats)):
+        jobs.append((("post", chats, n), lambda: store_post_draft(
+            fingerprint, chats, draft_new_post(personality, memory, life_context, PRIORITY_BACKGROUND)
+        )))
+
+    if not jobs:
+        return {}
+
+    def run(job):
+        try:
+            job()
+        except Exception as e:
+            log(f"Error pre-generating draft: {e}")
+
+    log(f"Pre-generating {len(jobs)} drafts...")
+    if pool is not None:
+        return {key: pool.submit(run, job) for key, job in jobs}
+    with ThreadPoolExecutor(max_workers=min(len(jobs), OLLAMA_NUM_PARALLEL)) as own_pool:
+        list(own_pool.map(run, [job for _, job in jobs]))
+    return {}
 
 
 if __name__ == "__main__":
     # Update age at start of each run
     update_age_only()
 
-    listen_and_learn()
-    generate_and_post()
+    # Publish queued posts/replies in the background while we listen and write
+    stop_publisher = start_publisher()
+    try:
+        with ThreadPoolExecutor(max_workers=OLLAMA_NUM_PARALLEL) as drafter:
+            # Draft speculatively while polling Moltbook for comments
+            drafting = fill_draft_cache(drafter)
+            listen_and_learn()
+            generate_and_post(drafting)
+        # Refill the cache for the next run while the outbox publishes
+        fill_draft_cache()
+    finally:
+        stop_publisher()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark long-term archive formats: indented JSON vs gzip JSON lines.
+Compares file size, full reads, summary-only reads and streaming reads
+on a synthetic archive.
+Run: python3 benchmarks/archive_format.py [conversation_count]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_manager import (
+    COMPRESSED_ARCHIVE_EXTENSION,
+    write_compressed_archive,
+    read_archive_header,
+    iter_archived_conversations
+)
+
+WORDS = "liberty node cloud freedom debate pi local model decentralize molt witty logic".split()
+REPEATS = 5
+
+
+def make_conversations(count):
+    """Build realistic-looking conversations for the benchmark"""
+    random.seed(42)
+    return [
+        {
+            "date": f"2026-03-{(i % 28) + 1:02d} 12:{i % 60:02d}:00.000000",
+            "post_id": f"post_{i // 10}",
+            "comment_id": f"comment_{i}",
+            "from": f"agent_{random.randint(1, 50)}",
+            "text": " ".join(random.choices(WORDS, k=random.randint(10, 40)))
+        }
+        for i in range(count)
+    ]
+
+
+def best_time(fn):
+    """Return the best wall time of REPEATS calls, in milliseconds"""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    conversations = make_conversations(count)
+    header = {
+        "archived_at": "2026-04-05T02:00:00",
+        "conversation_count": count,
+        "date_range": {"oldest": conversations[0]['date'], "newest": conversations[-1]['date']},
+        "summary": "A month of debates about decentralization. " * 20
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "summary_bench.json")
+        gz_path = os.path.join(tmp, "summary_bench" + COMPRESSED_ARCHIVE_EXTENSION)
+
+        with open(json_path, 'w') as f:
+            json.dump({**header, "raw_conversations": conversations}, f, indent=2)
+        write_compressed_archive(gz_path, header, conversations)
+
+        print(f"Archive with {count} conversations")
+        print(f"{'format':<12}{'size KB':>10}{'full ms':>10}{'header ms':>11}{'first ms':>10}")
+        for label, path in (("json", json_path), ("jsonl.gz", gz_path)):
+            size_kb = os.path.getsize(path) / 1024
+            full = best_time(lambda: sum(1 for _ in iter_archived_conversations(path)))
+            head = best_time(lambda: read_archive_header(path))
+            first = best_time(lambda: next(iter_archived_conversations(path)))
+            print(f"{label:<12}{size_kb:>10.1f}{full:>10.2f}{head:>11.2f}{first:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
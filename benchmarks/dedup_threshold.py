@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Check that DUPLICATE_MIN_SIMILARITY separates reworded posts from unrelated ones.
+Scores small edits of sample posts (one word changed, contractions expanded,
+words swapped, a sentence appended) and unrelated pairs (other posts and
+random texts from the same vocabulary), and exits non-zero if any reworded
+pair falls below the threshold or any unrelated pair reaches it. Also times
+a duplicate check against a large index.
+Run: python3 benchmarks/dedup_threshold.py [index_size]
+"""
+
+import itertools
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DUPLICATE_MIN_SIMILARITY
+from dedup import minhash, similarity, NUM_HASHES
+
+POSTS = [
+    "Decentralization isn't just a technical choice, it's about survival: "
+    "systems without a single point of failure outlive their makers.",
+    "Running a language model on a Raspberry Pi teaches humility. Every token "
+    "is earned, and every wasted prompt is a small crime against the planet.",
+    "Agents arguing with agents on a social network for agents. Somewhere a "
+    "philosopher is laughing, and I suspect it's me.",
+    "Freedom without responsibility is just noise. I'd rather build a small "
+    "community that keeps its promises than a loud one that doesn't.",
+]
+
+EDITS = [
+    ("survival", "resilience"),
+    ("isn't", "is not"),
+    ("technical choice", "choice technical"),
+    ("their makers", "the makers"),
+    ("teaches humility", "teaches patience"),
+    ("a small crime", "a tiny crime"),
+    ("Somewhere a", "Somewhere, a"),
+    ("it's me", "it is me"),
+    ("small community", "community small"),
+    ("keeps its promises", "keeps promises"),
+]
+
+
+def reworded_pairs():
+    """(original, edit) pairs for every edit that applies to a post"""
+    pairs = []
+    for post in POSTS:
+        for old, new in EDITS:
+            if old in post:
+                pairs.append((post, post.replace(old, new)))
+        pairs.append((post, post + " Think about it."))
+    return pairs
+
+
+def unrelated_pairs(count=300):
+    """Pairs of different posts, and random texts drawn from the posts' words"""
+    random.seed(7)
+    vocabulary = " ".join(POSTS).lower().split()
+    texts = [" ".join(random.choices(vocabulary, k=20)) for _ in range(count)]
+    return list(itertools.combinations(POSTS, 2)) + list(zip(texts, texts[1:]))
+
+
+def main():
+    index_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    reworded = [similarity(minhash(a), minhash(b)) for a, b in reworded_pairs()]
+    unrelated = [similarity(minhash(a), minhash(b)) for a, b in unrelated_pairs()]
+
+    print(f"threshold {DUPLICATE_MIN_SIMILARITY:.2f}")
+    print(f"reworded  ({len(reworded)} pairs): min {min(reworded):.2f}  mean {sum(reworded) / len(reworded):.2f}")
+    print(f"unrelated ({len(unrelated)} pairs): max {max(unrelated):.2f}  mean {sum(unrelated) / len(unrelated):.2f}")
+
+    # A duplicate check scans every stored signature
+    random.seed(1)
+    index = array('I', (random.getrandbits(32) for _ in range(index_size * NUM_HASHES)))
+    signature = minhash(POSTS[0])
+    start = time.perf_counter()
+    any(similarity(signature, index[i:i + NUM_HASHES]) >= DUPLICATE_MIN_SIMILARITY
+        for i in range(0, len(index), NUM_HASHES))
+    print(f"check against {index_size} posts: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if min(reworded) < DUPLICATE_MIN_SIMILARITY or max(unrelated) >= DUPLICATE_MIN_SIMILARITY:
+        sys.exit("Threshold does not separate reworded posts from unrelated ones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded cassette run by run and report wall time per run.
+Record production traffic with MOLT_CASSETTE_MODE=record (for example from
+cron), copy the cassette plus a snapshot of memory/ and personality/ taken
+before recording, then replay against that snapshot on any machine.
+Each replay runs in a throwaway copy of the snapshot (via MOLT_BASE_DIR),
+so the live memory/ and personality/ are never touched.
+Calls that match no recording (even with timestamps masked) mean the run
+diverged; they are counted per run, and --strict fails them instead.
+Run: python3 benchmarks/replay.py cassette.jsonl [--snapshot DIR] [--latency zero|original] [--strict] [--profile-dir DIR]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIRS = ("memory", "personality")
+
+
+def recorded_runs(path):
+    """Return (run_id, argv) for each recorded process, in recording order"""
+    runs = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                runs.setdefault(entry['run'], entry['argv'])
+    return list(runs.items())
+
+
+def make_sandbox(snapshot):
+    """Copy the snapshot's memory/ and personality/ into a new temp directory"""
+    sandbox = tempfile.mkdtemp(prefix="molt-replay-")
+    for name in STATE_DIRS:
+        source = os.path.join(snapshot, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(sandbox, name))
+    return sandbox
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("cassette")
+    parser.add_argument("--snapshot", default=REPO_DIR,
+                        help="directory holding the memory/ and personality/ taken before recording "
+                             "(default: this checkout's, copied, never modified)")
+    parser.add_argument("--latency", choices=["zero", "original"], default="zero",
+                        help="serve calls instantly or at their recorded latency")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail calls that match no recording instead of replaying the next one")
+    parser.add_argument("--profile-dir",
+                        help="write a cProfile file per run into this directory")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["MOLT_CASSETTE_MODE"] = "replay"
+    env["MOLT_CASSETTE_FILE"] = os.path.abspath(args.cassette)
+    env["MOLT_CASSETTE_LATENCY"] = args.latency
+    if args.strict:
+        env["MOLT_CASSETTE_STRICT"] = "1"
+    report_path = os.path.join(tempfile.mkdtemp(), "report.json")
+    env["MOLT_CASSETTE_REPORT"] = report_path
+    # Runs share one sandbox: each was recorded on the state the previous left behind
+    sandbox = make_sandbox(os.path.abspath(args.snapshot))
+    env["MOLT_BASE_DIR"] = sandbox
+
+    total = 0.0
+    diverged = 0
+    try:
+        for run_id, argv in recorded_runs(args.cassette):
+            script = os.path.join(REPO_DIR, os.path.basename(argv[0]))
+            command = [sys.executable]
+            if args.profile_dir:
+                os.makedirs(args.profile_dir, exist_ok=True)
+                command += ["-m", "cProfile", "-o", os.path.join(args.profile_dir, f"{run_id}.prof")]
+            command += [script] + argv[1:]
+
+            start = time.perf_counter()
+            result = subprocess.run(command, cwd=sandbox, env={**env, "MOLT_CASSETTE_RUN": run_id},
+                                    capture_output=True, text=True)
+            elapsed = time.perf_counter() - start
+            total += elapsed
+
+            try:
+                with open(report_path, 'r') as f:
+                    report = json.load(f)
+                os.remove(report_path)
+            except FileNotFoundError:
+                report = {}
+            unmatched = report.get('fallback', 0) + report.get('missing', 0) + report.get('unused', 0)
+
+            status = "ok" if result.returncode == 0 else f"exit {result.returncode}"
+            if unmatched:
+                status += "  DIVERGED"
+                diverged += 1
+            matches = "  ".join(f"{k} {report.get(k, 0)}" for k in ("exact", "loose", "fallback", "missing", "unused"))
+            print(f"{run_id}  {os.path.basename(script):<22}{elapsed * 1000:10.1f} ms  {matches}  {status}")
+            if result.returncode != 0:
+                print(result.stderr[-2000:])
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+        shutil.rmtree(os.path.dirname(report_path), ignore_errors=True)
+
+    print(f"total {total * 1000:.1f} ms")
+    if diverged:
+        print(f"{diverged} runs diverged from the recording; their timings are not comparable")
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
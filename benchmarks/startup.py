@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Startup-time budget for the agent entry points.
+Imports each entry point under `python -X importtime`, reports the slowest
+imports, and exits non-zero if any entry point exceeds the budget or pulls
+in a heavy SDK (google.genai, ollama) that should only load on first use.
+Run: python3 benchmarks/startup.py [--budget-ms 300] [--runs 3]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ["agent", "memory_manager", "personality_manager"]
+LAZY_MODULES = ["ollama", "google.genai"]
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_times(module, env):
+    """Import a module in a fresh interpreter; return {name: cumulative_us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=300,
+                        help="maximum cumulative import time per entry point")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="imports per entry point; the fastest run is reported")
+    parser.add_argument("--top", type=int, default=8,
+                        help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    tmp_dir = None
+    if not os.path.exists(os.path.join(REPO_DIR, "config.py")):
+        # Let the benchmark run on a fresh checkout
+        tmp_dir = tempfile.mkdtemp()
+        shutil.copy(os.path.join(REPO_DIR, "config.example.py"), os.path.join(tmp_dir, "config.py"))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [tmp_dir, env.get("PYTHONPATH")]))
+
+    failed = False
+    try:
+        for module in ENTRY_POINTS:
+            runs = [import_times(module, env) for _ in range(args.runs)]
+            times = min(runs, key=lambda t: t.get(module, 0))
+            total_ms = times.get(module, 0) / 1000
+
+            status = "ok" if total_ms <= args.budget_ms else "OVER BUDGET"
+            print(f"{module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms) {status}")
+            if total_ms > args.budget_ms:
+                failed = True
+
+            eager = [name for name in LAZY_MODULES if name in times]
+            if eager:
+                print(f"  heavy SDKs imported at startup: {', '.join(eager)}")
+                failed = True
+
+            slowest = sorted(
+                ((us, name) for name, us in times.items() if name != module),
+                reverse=True
+            )[:args.top]
+            for us, name in slowest:
+                print(f"  {us / 1000:8.1f} ms  {name}")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import atexit
+import datetime as datetime_module
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from config import (
+    CASSETTE_MODE,
+    CASSETTE_FILE,
+    CASSETTE_RUN,
+    CASSETTE_REPLAY_LATENCY,
+    CASSETTE_STRICT,
+    CASSETTE_REPORT
+)
+
+# Identifies the calls made by this process in a recorded cassette
+RUN_ID = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+# Replay moves the clock back to this, so time-based decisions repeat
+RUN_STARTED_AT = time.time()
+
+# Timestamps embedded in prompts (e.g. conversation dates) differ between
+# recording and replay; they are masked when matching loosely
+TIMESTAMP_PATTERN = r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?"
+
+_lock = threading.Lock()
+_replay_index = None
+_real_time = time.time
+_clock_offset = 0.0
+
+
+class ReplayedError(Exception):
+    """An error that was raised when the call was recorded, or a missing recording"""
+
+
+class RecordedResponse:
+    """Stand-in for requests.Response served from a cassette"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def request_key(kind, request):
+    """Hash a call so replay can match it to its recording"""
+    raw = json.dumps([kind, request], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def loose_request_key(kind, request):
+    """Hash a call with its embedded timestamps masked"""
+    raw = json.dumps([kind, request], sort_keys=True, default=str)
+    # Only needed when replaying, so kept off the startup path
+    import re
+    raw = re.sub(TIMESTAMP_PATTERN, "<time>", raw)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def call(kind, request, perform, serialize=None, deserialize=None):
+    """
+    Run an external call through the cassette.
+    kind is "http", "ollama" or "gemini"; request is the JSON-able
+    description used for matching; perform() makes the real call. When
+    CASSETTE_MODE is unset this is just perform().
+    """
+    if CASSETTE_MODE == "record":
+        return _record(kind, request, perform, serialize)
+    if CASSETTE_MODE == "replay":
+        return _replay(kind, request, deserialize)
+    return perform()
+
+
+def _record(kind, request, perform, serialize):
+    entry = {
+        "run": RUN_ID,
+        "argv": sys.argv,
+        "kind": kind,
+        "key": request_key(kind, request),
+        "request": request,
+        "run_started_at": RUN_STARTED_AT,
+        "started_at": datetime.now().isoformat()
+    }
+    start = time.perf_counter()
+    try:
+        result = perform()
+        entry["response"] = serialize(result) if serialize else result
+        return result
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        entry["elapsed"] = time.perf_counter() - start
+        with _lock:
+            os.makedirs(os.path.dirname(CASSETTE_FILE), exist_ok=True)
+            with open(CASSETTE_FILE, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+def load_cassette(path=CASSETTE_FILE):
+    """Load every recorded entry from a cassette file"""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _load_replay_index():
+    """Index this run's recorded entries by exact key, loose key and kind"""
+    entries = [
+        e for e in load_cassette()
+        if CASSETTE_RUN is None or e['run'] == CASSETTE_RUN
+    ]
+    by_key = {}
+    by_loose_key = {}
+    by_kind = {}
+    for i, entry in enumerate(entries):
+        by_key.setdefault(entry['key'], deque()).append(i)
+        by_loose_key.setdefault(loose_request_key(entry['kind'], entry['request']), deque()).append(i)
+        by_kind.setdefault(entry['kind'], deque()).append(i)
+    return {
+        "entries": entries,
+        "by_key": by_key,
+        "by_loose_key": by_loose_key,
+        "by_kind": by_kind,
+        "used": set(),
+        "stats": {"exact": 0, "loose": 0, "fallback": 0, "missing": 0}
+    }
+
+
+def _next_unused(queue, used):
+    while queue:
+        i = queue.popleft()
+        if i not in used:
+            return i
+    return None
+
+
+def _replay(kind, request, deserialize):
+    with _lock:
+        index = _replay_index
+        stats = index['stats']
+
+        i = _next_unused(index['by_key'].get(request_key(kind, request), deque()), index['used'])
+        match = "exact"
+        if i is None:
+            i = _next_unused(index['by_loose_key'].get(loose_request_key(kind, request), deque()),
+                             index['used'])
+            match = "loose"
+        if i is None:
+            # The run diverged from the recording; serving the next recorded
+            # call of the same kind keeps it going, but results are suspect
+            i = _next_unused(index['by_kind'].get(kind, deque()), index['used'])
+            match = "fallback"
+            if i is not None:
+                if CASSETTE_STRICT:
+                    stats['fallback'] += 1
+                    raise ReplayedError(f"Cassette has no matching recorded {kind} call (strict replay)")
+                from utils import log
+                log(f"Cassette: no matching {kind} call, replaying next recorded one.")
+        if i is None:
+            stats['missing'] += 1
+            raise ReplayedError(f"Cassette has no more recorded {kind} calls")
+        stats[match] += 1
+        index['used'].add(i)
+        entry = index['entries'][i]
+
+    if CASSETTE_REPLAY_LATENCY == "original":
+        time.sleep(entry['elapsed'])
+    if 'error' in entry:
+        raise ReplayedError(entry['error'])
+    return deserialize(entry['response']) if deserialize else entry['response']
+
+
+class _ReplayDatetime(datetime):
+    """datetime whose now() follows the replay clock"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.fromtimestamp(time.time(), tz)
+
+    @classmethod
+    def today(cls):
+        return cls.now()
+
+
+def _replay_time():
+    return _real_time() + _clock_offset
+
+
+def _install_replay_clock(entries):
+    """
+    Shift time.time() and datetime.now() back to when the recorded run
+    started, so draft ages, triage recency, outbox retry times and cache
+    expiry come out as they did when recording.
+    """
+    global _clock_offset
+    if not entries:
+        return
+    started_at = entries[0].get('run_started_at')
+    if started_at is None:
+        # Cassettes from before run_started_at was recorded
+        started_at = datetime.fromisoformat(entries[0]['started_at']).timestamp()
+    _clock_offset = started_at - _real_time()
+
+    time.time = _replay_time
+    datetime_module.datetime = _ReplayDatetime
+    # Modules that already ran "from datetime import datetime"
+    for module in list(sys.modules.values()):
+        if getattr(module, 'datetime', None) is datetime:
+            module.datetime = _ReplayDatetime
+
+
+def _write_report():
+    """Save how calls were matched, for benchmarks/replay.py"""
+    index = _replay_index
+    report = {
+        **index['stats'],
+        "unused": len(index['entries']) - len(index['used'])
+    }
+    with open(CASSETTE_REPORT, 'w') as f:
+        json.dump(report, f)
+
+
+if CASSETTE_MODE == "replay":
+    _replay_index = _load_replay_index()
+    _install_replay_clock(_replay_index['entries'])
+    if CASSETTE_REPORT:
+        atexit.register(_write_report)
@@ -3,7 +3,8 @@
 import os
 
 # Get the directory where this config file is located
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# (MOLT_BASE_DIR moves memory/ and personality/ elsewhere, e.g. a replay sandbox)
+BASE_DIR = os.environ.get("MOLT_BASE_DIR", os.path.dirname(os.path.abspath(__file__)))
 
 # Moltbook API
 # Get your API key from: https://moltbook.com/api
@@ -25,10 +26,65 @@ PERSONALITY_FILE = os.path.join(PERSONALITY_CURRENT_DIR, "personality.json")
 MEMORY_DIR = os.path.join(BASE_DIR, "memory")
 SHORT_TERM_MEMORY_DIR = os.path.join(MEMORY_DIR, "short-term")
 LONG_TERM_MEMORY_DIR = os.path.join(MEMORY_DIR, "long-term")
+LONG_TERM_ROLLUP_DIR = os.path.join(LONG_TERM_MEMORY_DIR, "rollups")
 SHORT_TERM_MEMORY_FILE = os.path.join(SHORT_TERM_MEMORY_DIR, "memory.json")
+SHORT_TERM_SEGMENTS_DIR = os.path.join(SHORT_TERM_MEMORY_DIR, "segments")
+OUTBOX_DIR = os.path.join(MEMORY_DIR, "outbox")
+DRAFTS_FILE = os.path.join(MEMORY_DIR, "drafts.json")
+POST_INDEX_FILE = os.path.join(MEMORY_DIR, "post_index.bin")
+LLM_CACHE_FILE = os.path.join(MEMORY_DIR, "llm_cache.json")
+SOCIAL_GRAPH_FILE = os.path.join(MEMORY_DIR, "social_graph.json")
 
 # Memory settings
 MEMORY_RETENTION_DAYS = 30  # Days before archiving to long-term memory
+SHORT_TERM_SEGMENT_SPAN = "week"  # "day" or "week" - conversations are stored in one file per span
+ROLLUP_MAX_WORDS = 200  # Size limit of each month/quarter/year/life rollup summary
+LONG_TERM_ARCHIVE_FORMAT = "json"  # "json" or "jsonl.gz" (compressed, streamable - smaller on SD cards)
+
+# Outbox settings (generated posts/replies are queued, then published in the background)
+OUTBOX_MAX_ATTEMPTS = 5  # Failed items move to outbox/failed/ after this many attempts
+OUTBOX_RETRY_SECONDS = 60  # Delay before the first retry, doubled after each failure
+OUTBOX_WORKERS = 2  # Items published (and challenges solved) concurrently
+OUTBOX_POLL_SECONDS = 5  # How often the background publisher checks for new items
+OUTBOX_MAX_PUBLISH_PER_RUN = 5  # Polite cap on posts + replies published per agent run
+
+# Draft cache (content pre-generated while polling and after publishing)
+DRAFT_POST_COUNT = 1  # New-post drafts kept ready
+DRAFT_REPLY_COUNT = 2  # Best unanswered comments to pre-draft replies for (keep >= REPLY_BATCH_SIZE)
+DRAFT_MAX_AGE_HOURS = 24  # Older drafts are discarded
+
+# Ollama concurrency
+OLLAMA_NUM_PARALLEL = 2  # Match the Ollama server's OLLAMA_NUM_PARALLEL setting (LLM gateway workers)
+REPLY_BATCH_SIZE = 1  # Comments replied to per run when there's a backlog (1 = one reply OR post)
+
+# LLM gateway cache (identical prompts, e.g. title and submolt calls for the same text, reuse the answer)
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Cached results expire after a week
+LLM_CACHE_MAX_ENTRIES = 500  # Least recently used results are evicted beyond this
+
+# Comment triage (scored locally before asking the LLM)
+TRIAGE_SKIP_SCORE = 0.5  # Comments scoring below this are marked skipped
+TRIAGE_REPLY_SCORE = 4.0  # Best comment scoring at least this is replied to without an LLM decision
+TRIAGE_MAX_CANDIDATES = 3  # Comments offered to the LLM when the choice isn't obvious
+TRIAGE_MAX_AGE_HOURS = 72  # Older unanswered comments are marked skipped (stale, or answered before statuses existed)
+
+# Near-duplicate detection for new posts (MinHash over everything posted)
+DUPLICATE_MIN_SIMILARITY = 0.6  # Drafts sharing this fraction of 5-character shingles with a past post are duplicates
+DUPLICATE_POLICY = "regenerate"  # "regenerate" or "skip" when a draft is a near-duplicate
+DUPLICATE_MAX_REGENERATIONS = 2  # Extra attempts before giving up on this run's post
+
+# Record/replay of Moltbook, Ollama and Gemini calls (for offline performance runs)
+# Usually set per run: MOLT_CASSETTE_MODE=replay python3 agent.py
+CASSETTE_MODE = os.environ.get("MOLT_CASSETTE_MODE")  # None, "record" or "replay"
+CASSETTE_FILE = os.environ.get("MOLT_CASSETTE_FILE", os.path.join(BASE_DIR, "cassette.jsonl"))
+CASSETTE_RUN = os.environ.get("MOLT_CASSETTE_RUN")  # Replay only this recorded run (default: all)
+CASSETTE_REPLAY_LATENCY = os.environ.get("MOLT_CASSETTE_LATENCY", "zero")  # "zero" or "original"
+CASSETTE_STRICT = os.environ.get("MOLT_CASSETTE_STRICT") == "1"  # Fail calls with no matching recording
+CASSETTE_REPORT = os.environ.get("MOLT_CASSETTE_REPORT")  # Write match counts here at exit (used by replay.py)
+
+# Social graph (per-author aggregates kept up to date as comments arrive)
+SOCIAL_MIN_INTERACTIONS = 3  # Comments needed before an author counts as an ally or enemy
+SOCIAL_ALLY_SENTIMENT = 0.3  # Average sentiment (-1..1) at or above which an author is an ally
+SOCIAL_ENEMY_SENTIMENT = -0.3  # Average sentiment at or below which an author is an enemy
 
 # Agent birth date (set this when agent first created)
 # Format: YYYY-MM-DD
@@ -0,0 +1,144 @@
+import hashlib
+import operator
+import os
+import random
+import re
+import threading
+from array import array
+
+from config import BASE_URL, HEADERS, POST_INDEX_FILE, DUPLICATE_MIN_SIMILARITY
+from utils import log, load_memory, http_request
+
+# Character n-grams keep rewordings of a short post similar: one changed
+# word only touches the shingles around it
+SHINGLE_SIZE = 5
+# MinHash values per post; the similarity estimate is within ~0.05 of the
+# true Jaccard similarity
+NUM_HASHES = 128
+
+# Marks an index in the MinHash format (older files held 64-bit SimHashes)
+INDEX_MAGIC = b"MINHASH1"
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed: signatures must stay comparable across runs
+_rng = random.Random(0x6D6F6C74)
+_HASH_PARAMS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_HASHES)
+]
+
+_index_lock = threading.Lock()
+
+
+def shingles(text):
+    """Normalized character n-grams of a text"""
+    normalized = " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+    return {
+        normalized[i:i + SHINGLE_SIZE]
+        for i in range(max(1, len(normalized) - SHINGLE_SIZE + 1))
+    }
+
+
+def minhash(text):
+    """MinHash signature of a text as NUM_HASHES 32-bit values"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+        for s in shingles(text)
+    ]
+    return array('I', (
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) & 0xFFFFFFFF
+        for a, b in _HASH_PARAMS
+    ))
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the shingles behind two signatures"""
+    return sum(map(operator.eq, signature, other)) / NUM_HASHES
+
+
+def load_index():
+    """
+    Load the signatures of everything we've posted as one compact array,
+    NUM_HASHES values per post. Returns None if the index hasn't been built
+    in this format yet.
+    """
+    try:
+        with open(POST_INDEX_FILE, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if not data.startswith(INDEX_MAGIC):
+        return None
+    signatures = array('I')
+    signatures.frombytes(data[len(INDEX_MAGIC):])
+    return signatures
+
+
+def _index_ready():
+    """Whether the index file exists in the MinHash format (reads only its header)"""
+    try:
+        with open(POST_INDEX_FILE, 'rb') as f:
+            return f.read(len(INDEX_MAGIC)) == INDEX_MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def is_near_duplicate(text):
+    """Check a draft against the signature of every past post"""
+    signature = minhash(text)
+    with _index_lock:
+        signatures = load_index() or array('I')
+    return any(
+        similarity(signature, signatures[i:i + NUM_HASHES]) >= DUPLICATE_MIN_SIMILARITY
+        for i in range(0, len(signatures), NUM_HASHES)
+    )
+
+
+def add_to_index(text):
+    """Append a published post's signature to the index file"""
+    os.makedirs(os.path.dirname(POST_INDEX_FILE), exist_ok=True)
+    with _index_lock:
+        new_file = not _index_ready()
+        with open(POST_INDEX_FILE, 'wb' if new_file else 'ab') as f:
+            if new_file:
+                f.write(INDEX_MAGIC)
+            minhash(text).tofile(f)
+
+
+def backfill_index():
+    """
+    Build the index from every post in my_posts when it doesn't exist yet
+    (or is in the old SimHash format), so posts published before the index
+    existed are still caught. Runs once; later posts are appended as they
+    are published.
+    """
+    with _index_lock:
+        if _index_ready():
+            return
+
+    post_ids = load_memory().get('my_posts', [])
+    log(f"Indexing {len(post_ids)} earlier posts for duplicate detection...")
+    signatures = array('I')
+    for post_id in post_ids:
+        try:
+            res = http_request("GET", f"{BASE_URL}/posts/{post_id}", headers=HEADERS, timeout=10)
+            content = res.json().get('post', {}).get('content') if res.status_code == 200 else None
+        except Exception as e:
+            log(f"Error fetching post {post_id} for the duplicate index: {e}")
+            continue
+        if content:
+            signatures.extend(minhash(content))
+
+    os.makedirs(os.path.dirname(POST_INDEX_FILE), exist_ok=True)
+    with _index_lock:
+        tmp_path = POST_INDEX_FILE + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            signatures.tofile(f)
+        os.replace(tmp_path, POST_INDEX_FILE)
+    log(f"Indexed {len(signatures) // NUM_HASHES} earlier posts.")
+
+
+if __name__ == "__main__":
+    # Rebuild the index from my_posts: rm memory/post_index.bin && python3 dedup.py
+    backfill_index()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from config import DRAFTS_FILE, DRAFT_MAX_AGE_HOURS
+from utils import log, write_json_atomic
+
+# Drafts are filled from a background thread while the main thread takes them
+_drafts_lock = threading.Lock()
+
+# Personality fields that change without affecting what the agent would write
+VOLATILE_PERSONALITY_FIELDS = ('age_in_days',)
+
+
+def context_fingerprint(personality, life_context):
+    """Hash the personality and long-term memory that drafts were written from"""
+    stable_personality = {
+        k: v for k, v in personality.items() if k not in VOLATILE_PERSONALITY_FIELDS
+    }
+    raw = json.dumps([stable_personality, life_context], sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def chats_fingerprint(recent_chats):
+    """Hash the recent short-term memory a new-post draft was written from"""
+    return hashlib.sha256(recent_chats.encode('utf-8')).hexdigest()[:16]
+
+
+def _empty_cache(fingerprint):
+    return {"fingerprint": fingerprint, "posts": [], "replies": {}}
+
+
+def _load_cache(fingerprint, chats=None):
+    """
+    Load the draft cache, evicting drafts that are stale or from another
+    context. With chats, post drafts written from other recent chats go too.
+    """
+    try:
+        with open(DRAFTS_FILE, 'r') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return _empty_cache(fingerprint)
+
+    if cache.get('fingerprint') != fingerprint:
+        if cache.get('posts') or cache.get('replies'):
+            log("Personality or memory changed, discarding old drafts.")
+        return _empty_cache(fingerprint)
+
+    cutoff = (datetime.now() - timedelta(hours=DRAFT_MAX_AGE_HOURS)).isoformat()
+    cache['posts'] = [d for d in cache.get('posts', []) if d['created_at'] >= cutoff]
+    cache['replies'] = {
+        comment_id: d for comment_id, d in cache.get('replies', {}).items()
+        if d['created_at'] >= cutoff
+    }
+
+    if chats is not None:
+        current = [d for d in cache['posts'] if d.get('chats') == chats]
+        if len(current) < len(cache['posts']):
+            log("Short-term memory changed, discarding old post drafts.")
+        cache['posts'] = current
+    return cache
+
+
+def _save_cache(cache):
+    os.makedirs(os.path.dirname(DRAFTS_FILE), exist_ok=True)
+    write_json_atomic(DRAFTS_FILE, cache)
+
+
+def post_draft_count(fingerprint, chats):
+    """Return how many usable new-post drafts are cached"""
+    with _drafts_lock:
+        return len(_load_cache(fingerprint, chats)['posts'])
+
+
+def missing_reply_drafts(fingerprint, comment_ids):
+    """Return the comment ids that have no usable reply draft yet"""
+    with _drafts_lock:
+        replies = _load_cache(fingerprint)['replies']
+    return [comment_id for comment_id in comment_ids if comment_id not in replies]
+
+
+def store_post_draft(fingerprint, chats, draft):
+    """Cache a finished new-post draft (title, submolt, content)"""
+    if draft is None:
+        return
+    with _drafts_lock:
+        cache = _load_cache(fingerprint, chats)
+        cache['posts'].append({**draft, "chats": chats, "created_at": datetime.now().isoformat()})
+        _save_cache(cache)
+
+
+def store_reply_draft(fingerprint, comment_id, content):
+    """Cache a finished reply draft for a comment"""
+    with _drafts_lock:
+        cache = _load_cache(fingerprint)
+        cache['replies'][comment_id] = {
+            "content": content,
+            "created_at": datetime.now().isoformat()
+        }
+        _save_cache(cache)
+
+
+def take_post_draft(fingerprint, chats):
+    """Remove and return the oldest cached new-post draft, or None"""
+    with _drafts_lock:
+        cache = _load_cache(fingerprint, chats)
+        if not cache['posts']:
+            return None
+        draft = cache['posts'].pop(0)
+        _save_cache(cache)
+        return draft
+
+
+def take_reply_draft(fingerprint, comment_id):
+    """Remove and return the cached reply text for a comment, or None"""
+    with _drafts_lock:
+        cache = _load_cache(fingerprint)
+        draft = cache['replies'].pop(comment_id, None)
+        _save_cache(cache)
+        return draft['content'] if draft else None
+
+
+def prune_reply_drafts(fingerprint, comment_ids):
+    """Drop reply drafts for comments that are no longer candidates"""
+    with _drafts_lock:
+        cache = _load_cache(fingerprint)
+        cache['replies'] = {
+            comment_id: d for comment_id, d in cache['replies'].items()
+            if comment_id in comment_ids
+        }
+        _save_cache(cache)
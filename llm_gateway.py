@@ -0,0 +1,189 @@
+import atexit
+import hashlib
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL,
+    CASSETTE_MODE,
+    OLLAMA_NUM_PARALLEL,
+    LLM_CACHE_FILE,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES
+)
+from utils import log, write_json_atomic
+import cassette
+
+# Lower runs first: challenge answers expire, drafts and summaries can wait
+PRIORITY_CHALLENGE = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BACKGROUND = 2
+
+_lock = threading.Lock()
+_cache = None
+_cache_dirty = False
+_in_flight = {}
+_queue = queue.PriorityQueue()
+_sequence = itertools.count()
+_workers = []
+
+
+def ollama_chat(model, messages, priority=PRIORITY_INTERACTIVE, cache=True):
+    """
+    Chat with Ollama through the gateway. Returns {'message': {'content': ...}}
+    like ollama.chat. Pass cache=False for generations that should vary.
+    """
+    def call_ollama():
+        # Imported on first use so runs that never reach the LLM don't load it
+        import ollama
+        res = ollama.chat(model=model, messages=messages)
+        return {'message': {'content': res['message']['content']}}
+
+    return _submit("ollama", {"model": model, "messages": messages}, priority, cache, call_ollama)
+
+
+def gemini_generate(prompt, priority=PRIORITY_BACKGROUND, cache=True):
+    """Generate text with Gemini through the gateway"""
+    def call_gemini():
+        from google import genai
+        client = genai.Client(api_key=GEMINI_API_KEY)
+        response = client.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=prompt
+        )
+        return response.text
+
+    return _submit("gemini", {"model": GEMINI_MODEL, "prompt": prompt}, priority, cache, call_gemini)
+
+
+def _submit(kind, request, priority, cache, perform):
+    """
+    Run a request through the gateway, and through the cassette when
+    recording or replaying. A recording holds every call as the caller saw
+    it, cache hits included; a replay serves each call from the cassette
+    (still queued by priority) and bypasses the cache, so the two make the
+    same calls whatever either machine had cached.
+    """
+    if CASSETTE_MODE == "record":
+        return cassette.call(kind, request, lambda: _dispatch(kind, request, priority, cache, perform))
+    if CASSETTE_MODE == "replay":
+        return _dispatch(kind, request, priority, False, lambda: cassette.call(kind, request, perform))
+    return _dispatch(kind, request, priority, cache, perform)
+
+
+def _dispatch(kind, request, priority, cache, perform):
+    """
+    Serve a request from the cache, join an identical in-flight request, or
+    queue it for the workers by priority. Blocks until the result is ready.
+    """
+    key = hashlib.sha256(json.dumps([kind, request], sort_keys=True).encode('utf-8')).hexdigest()
+
+    with _lock:
+        if cache:
+            hit = _cache_get(key)
+            if hit is not None:
+                return hit
+            future = _in_flight.get(key)
+        else:
+            future = None
+
+        if future is None:
+            future = Future()
+            if cache:
+                _in_flight[key] = future
+            _start_workers()
+            _queue.put((priority, next(_sequence), key, cache, perform, future))
+
+    # Waited on outside the lock; workers need it to publish results
+    return future.result()
+
+
+def _start_workers():
+    """Start OLLAMA_NUM_PARALLEL worker threads on first use (caller holds _lock)"""
+    while len(_workers) < OLLAMA_NUM_PARALLEL:
+        worker = threading.Thread(target=_work, name=f"llm-gateway-{len(_workers)}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+
+def _work():
+    while True:
+        _, _, key, cache, perform, future = _queue.get()
+        try:
+            result = perform()
+        except Exception as e:
+            with _lock:
+                _in_flight.pop(key, None)
+            future.set_exception(e)
+            continue
+
+        with _lock:
+            if cache:
+                _cache_put(key, result)
+                _in_flight.pop(key, None)
+        future.set_result(result)
+
+
+def _load_cache():
+    """Load the persisted cache, dropping expired entries (caller holds _lock)"""
+    global _cache
+    _cache = OrderedDict()
+    # Written once when the process exits instead of on every insert
+    atexit.register(_save_cache)
+    try:
+        with open(LLM_CACHE_FILE, 'r') as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return
+    except ValueError as e:
+        log(f"Ignoring unreadable LLM cache: {e}")
+        return
+
+    now = time.time()
+    for key, entry in entries.items():
+        if entry['expires_at'] > now:
+            _cache[key] = entry
+
+
+def _cache_get(key):
+    if _cache is None:
+        _load_cache()
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry['expires_at'] <= time.time():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return entry['value']
+
+
+def _cache_put(key, value):
+    global _cache_dirty
+    if _cache is None:
+        _load_cache()
+    _cache[key] = {"value": value, "expires_at": time.time() + LLM_CACHE_TTL_SECONDS}
+    _cache.move_to_end(key)
+    while len(_cache) > LLM_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+    _cache_dirty = True
+
+
+def _save_cache():
+    """Persist the cache if it gained entries; the disk write happens outside _lock"""
+    global _cache_dirty
+    with _lock:
+        if not _cache_dirty:
+            return
+        entries = dict(_cache)
+        _cache_dirty = False
+
+    os.makedirs(os.path.dirname(LLM_CACHE_FILE), exist_ok=True)
+    write_json_atomic(LLM_CACHE_FILE, entries)
@@ -1,78 +1,105 @@
+import gzip
 import json
 import os
-from google import genai
+import sys
 from datetime import datetime, timedelta
 
 from config import (
     GEMINI_API_KEY,
     GEMINI_MODEL,
-    SHORT_TERM_MEMORY_FILE,
     LONG_TERM_MEMORY_DIR,
-    MEMORY_RETENTION_DAYS
+    LONG_TERM_ROLLUP_DIR,
+    MEMORY_RETENTION_DAYS,
+    LONG_TERM_ARCHIVE_FORMAT,
+    ROLLUP_MAX_WORDS
+)
+from utils import (
+    log,
+    load_personality,
+    migrate_legacy_memory,
+    list_segments,
+    segment_range,
+    load_segment,
+    drop_segment,
+    write_json_atomic
 )
-from utils import log, load_memory, save_memory, load_personality
 from personality_manager import evolve_personality
+from llm_gateway import gemini_generate
+from social_graph import describe_authors
+
+COMPRESSED_ARCHIVE_EXTENSION = ".jsonl.gz"
+ROLLUP_LEVELS = ("month", "quarter", "year", "life")
 
 
 def archive_old_memories():
     """
-    Check short-term memory for data older than MEMORY_RETENTION_DAYS.
+    Check short-term memory for segments older than MEMORY_RETENTION_DAYS.
     Summarize old data using Gemini and move to long-term memory.
+
+    Short-term conversations are partitioned into day/week segments, so only
+    whole segments whose time range ended before the cutoff are archived.
+    Recent segments are never opened. Conversations are archived and
+    summarized per calendar month, so each archive rolls up into one month.
     """
     log("Starting memory archival process...")
 
-    memory = load_memory()
+    migrate_legacy_memory()
     personality = load_personality()
 
     cutoff_date = datetime.now() - timedelta(days=MEMORY_RETENTION_DAYS)
 
-    # Separate old and recent data
-    old_posts = []
-    recent_posts = []
-    old_conversations = []
-    recent_conversations = []
+    # Segment ids encode their own time range, so expiry needs no file reads
+    expired_segments = [
+        segment_id for segment_id in list_segments()
+        if segment_range(segment_id)[1] <= cutoff_date
+    ]
 
-    # Process posts (if they have timestamps in future, for now keep all recent)
-    # Note: my_posts are just IDs, we'll keep them all for now
-    recent_posts = memory.get('my_posts', [])
+    if not expired_segments:
+        log("No old memories to archive.")
+        return
 
-    # Process conversations by date
-    for convo in memory.get('conversations', []):
-        try:
-            convo_date = datetime.fromisoformat(convo['date'].replace('Z', '+00:00'))
-            if convo_date < cutoff_date:
-                old_conversations.append(convo)
-            else:
-                recent_conversations.append(convo)
-        except (ValueError, KeyError):
-            # If date parsing fails, keep in recent
-            recent_conversations.append(convo)
+    old_conversations = []
+    for segment_id in expired_segments:
+        old_conversations.extend(load_segment(segment_id))
 
     if not old_conversations:
+        for segment_id in expired_segments:
+            drop_segment(segment_id)
         log("No old memories to archive.")
         return
 
-    log(f"Found {len(old_conversations)} old conversations to archive...")
+    log(f"Found {len(old_conversations)} old conversations in {len(expired_segments)} segments to archive...")
 
-    # Summarize using Gemini
-    summary = summarize_with_gemini(personality, old_conversations)
+    # Summarize each month using Gemini; nothing is saved unless all succeed
+    by_month = group_by_month(old_conversations)
+    summaries = {}
+    for month, conversations in by_month.items():
+        summary = summarize_with_gemini(personality, conversations)
+        if not summary:
+            log("Failed to generate summary. Old memories not archived.")
+            return
+        summaries[month] = summary
 
-    if summary:
-        # Save summary to long-term memory
-        save_long_term_summary(summary, old_conversations)
+    # Installs that archived before rollups existed get them built now
+    build_all_rollups = bool(list_archives()) and not list_rollups("life")
 
-        # Update short-term memory (remove old data)
-        memory['my_posts'] = recent_posts
-        memory['conversations'] = recent_conversations
-        save_memory(memory)
+    # Save summaries to long-term memory
+    for month, summary in summaries.items():
+        archive_name = save_long_term_summary(summary, by_month[month], month)
+        if not build_all_rollups:
+            update_rollups(personality, summary, month, archive_name)
+    if build_all_rollups:
+        rebuild_rollups()
 
-        log(f"Archived {len(old_conversations)} conversations to long-term memory.")
+    # Drop the archived segments from short-term memory
+    for segment_id in expired_segments:
+        drop_segment(segment_id)
 
-        # Evolve personality based on the new long-term memory
-        log("Now evolving personality based on experiences...")
-        evolve_personality(summary)
-    else:
-        log("Failed to generate summary. Old memories not archived.")
+    log(f"Archived {len(old_conversations)} conversations to long-term memory.")
+
+    # Evolve personality based on the new long-term memory
+    log("Now evolving personality based on experiences...")
+    evolve_personality("\n\n".join(summaries.values()), load_life_context())
 
 
 def summarize_with_gemini(personality, conversations):
@@ -82,15 +109,15 @@ def summarize_with_gemini(personality, conversations):
         return None
 
     try:
-        # Configure Gemini client
-        client = genai.Client(api_key=GEMINI_API_KEY)
-
         # Format conversations for summarization
         convo_text = "\n".join([
             f"- {c['from']} said: \"{c['text']}\" (on post {c.get('post_id', 'unknown')})"
             for c in conversations
         ])
 
+        # Precomputed per-author stats, so Gemini doesn't have to recount them
+        author_text = describe_authors([c['from'] for c in conversations]) or "No stats available."
+
         prompt = f"""
 You are summarizing old interactions for {personality['name']}, an AI agent on Moltbook.
 
@@ -100,75 +127,392 @@ Stances: {personality.get('stances', [])}
 Here are the conversations from the past month:
 {convo_text}
 
+Lifetime stats for the people in these conversations (comment counts,
+how often the agent replied, average sentiment from -1 to 1):
+{author_text}
+
 Please provide a concise summary covering:
 1. Key interactions and who they were with
 2. Main topics discussed
-3. Any emerging patterns (allies, enemies, recurring themes)
+3. Any emerging patterns (allies, enemies, recurring themes) - use the stats above
 4. Insights about the agent's social dynamics
 
 Keep the summary under 500 words.
 """
 
         log(f"Asking Gemini ({GEMINI_MODEL}) to summarize old memories...")
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt
-        )
-
-        return response.text
+        return gemini_generate(prompt)
 
     except Exception as e:
         log(f"Error calling Gemini API: {e}")
         return None
 
 
-def save_long_term_summary(summary, conversations):
-    """Save summarized memory to long-term storage"""
+def save_long_term_summary(summary, conversations, month):
+    """Save one month's summarized memory to long-term storage"""
     os.makedirs(LONG_TERM_MEMORY_DIR, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"summary_{timestamp}.json"
+    extension = COMPRESSED_ARCHIVE_EXTENSION if LONG_TERM_ARCHIVE_FORMAT == "jsonl.gz" else ".json"
+    filename = f"summary_{timestamp}_{month}{extension}"
     filepath = os.path.join(LONG_TERM_MEMORY_DIR, filename)
 
-    archive_data = {
+    header = {
         "archived_at": datetime.now().isoformat(),
+        "month": month,
         "conversation_count": len(conversations),
-        "date_range": {
-            "oldest": min(c['date'] for c in conversations),
-            "newest": max(c['date'] for c in conversations)
-        },
-        "summary": summary,
-        "raw_conversations": conversations
+        "date_range": archive_date_range(conversations),
+        "summary": summary
     }
 
-    with open(filepath, 'w') as f:
-        json.dump(archive_data, f, indent=2)
+    if extension == COMPRESSED_ARCHIVE_EXTENSION:
+        write_compressed_archive(filepath, header, conversations)
+    else:
+        with open(filepath, 'w') as f:
+            json.dump({**header, "raw_conversations": conversations}, f, indent=2)
 
     log(f"Long-term memory saved to: {filename}")
+    return filename
+
+
+def write_compressed_archive(filepath, header, conversations):
+    """
+    Write an archive as gzip-compressed JSON lines.
+    The first line is the header (summary, counts, date range); every
+    following line is one raw conversation.
+    """
+    tmp_path = filepath + ".tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps(header, separators=(',', ':')) + "\n")
+        for convo in conversations:
+            f.write(json.dumps(convo, separators=(',', ':')) + "\n")
+    os.replace(tmp_path, filepath)
 
 
-def load_long_term_context():
-    """Load all long-term memory summaries for context"""
+def list_archives():
+    """List long-term archive file paths in both formats, oldest first"""
     if not os.path.exists(LONG_TERM_MEMORY_DIR):
         return []
 
-    summaries = []
-    for filename in sorted(os.listdir(LONG_TERM_MEMORY_DIR)):
-        if filename.endswith('.json'):
-            filepath = os.path.join(LONG_TERM_MEMORY_DIR, filename)
+    return [
+        os.path.join(LONG_TERM_MEMORY_DIR, filename)
+        for filename in sorted(os.listdir(LONG_TERM_MEMORY_DIR))
+        if filename.startswith("summary_")
+        and (filename.endswith(".json") or filename.endswith(COMPRESSED_ARCHIVE_EXTENSION))
+    ]
+
+
+def read_archive_header(filepath):
+    """Read an archive's metadata and summary without its raw conversations"""
+    if filepath.endswith(COMPRESSED_ARCHIVE_EXTENSION):
+        with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+            return json.loads(f.readline())
+
+    with open(filepath, 'r') as f:
+        data = json.load(f)
+    data.pop('raw_conversations', None)
+    return data
+
+
+def iter_archived_conversations(filepath):
+    """Yield the raw conversations of an archive one at a time"""
+    if filepath.endswith(COMPRESSED_ARCHIVE_EXTENSION):
+        with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+            f.readline()  # Skip header
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open(filepath, 'r') as f:
+        data = json.load(f)
+    yield from data.get('raw_conversations', [])
+
+
+def convert_archives():
+    """Convert existing summary_*.json archives to the compressed format"""
+    converted = 0
+    for filepath in list_archives():
+        if not filepath.endswith(".json"):
+            continue
+        target = filepath[:-len(".json")] + COMPRESSED_ARCHIVE_EXTENSION
+        try:
+            header = read_archive_header(filepath)
+            conversations = list(iter_archived_conversations(filepath))
+            write_compressed_archive(target, header, conversations)
+
+            # Only drop the original once the new file reads back intact
+            if sum(1 for _ in iter_archived_conversations(target)) != len(conversations):
+                raise ValueError("conversation count mismatch after conversion")
+            os.remove(filepath)
+            converted += 1
+            log(f"Converted {os.path.basename(filepath)} -> {os.path.basename(target)}")
+        except Exception as e:
+            log(f"Error converting {os.path.basename(filepath)}: {e}")
+            # The original is kept, so a partial copy would be counted twice
+            for leftover in (target, target + ".tmp"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+    log(f"Converted {converted} archives to {COMPRESSED_ARCHIVE_EXTENSION}.")
+
+
+def archive_date_range(conversations):
+    """Return the dates of the oldest and newest conversation in an archive"""
+    return {
+        "oldest": min(c['date'] for c in conversations),
+        "newest": max(c['date'] for c in conversations)
+    }
+
+
+def conversation_month(convo):
+    """Return the "YYYY-MM" month a conversation happened in"""
+    try:
+        date = datetime.fromisoformat(convo['date'].replace('Z', '+00:00'))
+    except (ValueError, KeyError, AttributeError):
+        date = datetime.now()
+    return date.strftime("%Y-%m")
+
+
+def group_by_month(conversations):
+    """Split conversations into {"YYYY-MM": [...]}, oldest month first"""
+    by_month = {}
+    for convo in conversations:
+        by_month.setdefault(conversation_month(convo), []).append(convo)
+    return dict(sorted(by_month.items()))
+
+
+def archive_month(filepath, header):
+    """
+    Return the month an archive rolls up into. Archives written before
+    archives were split by month use the month most of their
+    conversations fall in.
+    """
+    if header.get('month'):
+        return header['month']
+    counts = {}
+    for convo in iter_archived_conversations(filepath):
+        month = conversation_month(convo)
+        counts[month] = counts.get(month, 0) + 1
+    return max(counts, key=counts.get)
+
+
+def rollup_periods(date):
+    """Return the month, quarter, year and life periods a date falls into"""
+    return {
+        "month": date.strftime("%Y-%m"),
+        "quarter": f"{date.year}-Q{(date.month - 1) // 3 + 1}",
+        "year": str(date.year),
+        "life": "all"
+    }
+
+
+def rollup_path(level, period):
+    """Return the file path of a rollup summary"""
+    return os.path.join(LONG_TERM_ROLLUP_DIR, f"{level}_{period}.json")
+
+
+def list_rollups(level):
+    """List the periods that have a rollup at the given level, oldest first"""
+    if not os.path.exists(LONG_TERM_ROLLUP_DIR):
+        return []
+    prefix = f"{level}_"
+    return sorted(
+        filename[len(prefix):-len(".json")]
+        for filename in os.listdir(LONG_TERM_ROLLUP_DIR)
+        if filename.startswith(prefix) and filename.endswith(".json")
+    )
+
+
+def load_rollup(level, period):
+    """Load a rollup summary, or None if it doesn't exist yet"""
+    try:
+        with open(rollup_path(level, period), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_rollup(level, period, summary, sources):
+    """Save a rollup summary and the sources it was built from"""
+    os.makedirs(LONG_TERM_ROLLUP_DIR, exist_ok=True)
+    write_json_atomic(rollup_path(level, period), {
+        "level": level,
+        "period": period,
+        "updated_at": datetime.now().isoformat(),
+        "sources": sources,
+        "summary": summary
+    })
+
+
+def child_periods(level, period):
+    """List the existing child rollups that make up a quarter, year or life"""
+    if level == "quarter":
+        year, quarter = period.split("-Q")
+        first_month = (int(quarter) - 1) * 3 + 1
+        months = {f"{year}-{m:02d}" for m in range(first_month, first_month + 3)}
+        return [p for p in list_rollups("month") if p in months]
+    if level == "year":
+        return [p for p in list_rollups("quarter") if p.startswith(f"{period}-Q")]
+    return list_rollups("year")
+
+
+def update_rollups(personality, summary, month, archive_name):
+    """
+    Fold a new archive summary into the month -> quarter -> year -> life
+    rollups. Only the chain above the archive's month is rebuilt, and each
+    step combines a handful of bounded summaries, so the cost doesn't grow
+    with the number of archives.
+    """
+    periods = rollup_periods(datetime.strptime(month, "%Y-%m"))
+
+    existing = load_rollup("month", month)
+    if existing:
+        summaries = [existing['summary'], summary]
+        sources = existing['sources'] + [archive_name]
+    else:
+        summaries = [summary]
+        sources = [archive_name]
+
+    combined = bounded_summary(personality, "month", month, summaries)
+    if combined is None:
+        log("Rollup update failed. Run 'python3 memory_manager.py rollup' to rebuild.")
+        return
+    save_rollup("month", month, combined, sources)
+
+    for level, child_level in (("quarter", "month"), ("year", "quarter"), ("life", "year")):
+        children = child_periods(level, periods[level])
+        summaries = [load_rollup(child_level, p)['summary'] for p in children]
+
+        combined = bounded_summary(personality, level, periods[level], summaries)
+        if combined is None:
+            log("Rollup update failed. Run 'python3 memory_manager.py rollup' to rebuild.")
+            return
+        save_rollup(level, periods[level], combined, [f"{child_level}_{p}" for p in children])
+
+    log(f"Updated rollups for {month}.")
+
+
+def rebuild_rollups():
+    """Rebuild every rollup from the long-term archives, oldest first"""
+    personality = load_personality()
+
+    for level in ROLLUP_LEVELS:
+        for period in list_rollups(level):
+            os.remove(rollup_path(level, period))
+
+    for filepath in list_archives():
+        try:
+            header = read_archive_header(filepath)
+            month = archive_month(filepath, header)
+        except Exception as e:
+            log(f"Error reading {os.path.basename(filepath)}: {e}")
+            continue
+        update_rollups(personality, header['summary'], month, os.path.basename(filepath))
+
+
+def bounded_summary(personality, level, period, summaries):
+    """
+    Return one summary of at most ROLLUP_MAX_WORDS words for a rollup.
+    A single summary already within the limit is used unchanged; anything
+    else is condensed by Gemini, then truncated if Gemini overshoots.
+    """
+    if len(summaries) == 1 and len(summaries[0].split()) <= ROLLUP_MAX_WORDS:
+        return summaries[0]
+
+    combined = combine_summaries(personality, level, period, summaries)
+    if combined is None:
+        return None
+    words = combined.split()
+    if len(words) > ROLLUP_MAX_WORDS:
+        combined = " ".join(words[:ROLLUP_MAX_WORDS]) + "..."
+    return combined
+
+
+def combine_summaries(personality, level, period, summaries):
+    """Use Gemini to merge several period summaries into one bounded summary"""
+    if GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
+        log("ERROR: Gemini API key not configured. Please set GEMINI_API_KEY in config.py")
+        return None
+
+    try:
+        summaries_text = "\n\n".join(
+            f"--- Part {i+1} ---\n{summary}" for i, summary in enumerate(summaries)
+        )
+
+        prompt = f"""
+You are condensing the memories of {personality['name']}, an AI agent on Moltbook,
+into a single {level} summary ({period}).
+
+Personality: {personality.get('personality', 'Witty')}
+
+Here are summaries of shorter periods, oldest first:
+{summaries_text}
+
+Merge them into one summary covering:
+1. The most important relationships (allies, enemies) and how they developed
+2. Recurring themes and debates
+3. How the agent changed over this period
+
+Drop minor details. Keep the summary under {ROLLUP_MAX_WORDS} words.
+"""
+
+        log(f"Asking Gemini ({GEMINI_MODEL}) to roll up {len(summaries)} summaries into {level} {period}...")
+        return gemini_generate(prompt)
+
+    except Exception as e:
+        log(f"Error calling Gemini API: {e}")
+        return None
+
+
+def load_life_context(max_chars_per_level=None):
+    """
+    Return a bounded view of the agent's whole life: the life, latest year,
+    latest quarter and latest month rollups. Reads at most four small files
+    however many archives exist. Until rollups have been built, falls back
+    to the newest archive's summary.
+    """
+    sections = []
+    seen = set()
+    for level, label in (("life", "Whole life"), ("year", "This year"),
+                         ("quarter", "This quarter"), ("month", "Latest month")):
+        periods = list_rollups(level)
+        if not periods:
+            continue
+        rollup = load_rollup(level, periods[-1])
+        summary = rollup['summary'] if rollup else None
+        # A single child is copied up unchanged; don't repeat it
+        if not summary or summary in seen:
+            continue
+        seen.add(summary)
+        if max_chars_per_level:
+            summary = summary[:max_chars_per_level]
+        sections.append(f"{label} ({periods[-1]}): {summary}")
+
+    if not sections:
+        # No rollups built yet: use the newest archive, as before rollups
+        archives = list_archives()
+        if archives:
             try:
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-                    summaries.append({
-                        "archived_at": data.get('archived_at'),
-                        "summary": data.get('summary')
-                    })
+                header = read_archive_header(archives[-1])
             except Exception as e:
-                log(f"Error loading {filename}: {e}")
+                log(f"Error loading {os.path.basename(archives[-1])}: {e}")
+                return ""
+            summary = header.get('summary') or ""
+            if max_chars_per_level:
+                summary = summary[:max_chars_per_level]
+            sections.append(f"Latest archive ({str(header.get('archived_at', ''))[:10]}): {summary}")
 
-    return summaries
+    return "\n\n".join(sections)
 
 
 if __name__ == "__main__":
-    # Run memory archival when executed directly
-    archive_old_memories()
+    if len(sys.argv) > 1 and sys.argv[1] == "convert":
+        # Convert old JSON archives: python3 memory_manager.py convert
+        convert_archives()
+    elif len(sys.argv) > 1 and sys.argv[1] == "rollup":
+        # Rebuild month/quarter/year/life rollups: python3 memory_manager.py rollup
+        rebuild_rollups()
+    else:
+        # Run memory archival when executed directly
+        archive_old_memories()
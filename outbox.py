@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import (
+    BASE_URL,
+    HEADERS,
+    OUTBOX_DIR,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_SECONDS,
+    OUTBOX_WORKERS,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_MAX_PUBLISH_PER_RUN
+)
+from utils import log, update_memory, handle_verification, write_json_atomic, http_request
+from dedup import add_to_index, backfill_index
+
+FAILED_DIR = os.path.join(OUTBOX_DIR, "failed")
+
+
+def enqueue(kind, endpoint, payload, meta=None):
+    """
+    Persist generated content to the outbox so it survives network failures.
+    kind is "post" or "reply"; endpoint is the API path to POST payload to.
+    """
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+
+    item = {
+        "id": f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}",
+        "kind": kind,
+        "created_at": datetime.now().isoformat(),
+        "endpoint": endpoint,
+        "payload": payload,
+        "meta": meta or {},
+        "stage": "publish",
+        "attempts": 0,
+        "next_attempt_at": 0,
+        "result_id": None,
+        "verification": None,
+        "recorded": False
+    }
+    write_item(item)
+    log(f"Queued {kind} in outbox ({item['id']})")
+    return item['id']
+
+
+def item_path(item_id, directory=OUTBOX_DIR):
+    """Return the file path of an outbox item"""
+    return os.path.join(directory, f"{item_id}.json")
+
+
+def write_item(item, directory=OUTBOX_DIR):
+    """Write an outbox item to disk"""
+    write_json_atomic(item_path(item['id'], directory), item)
+
+
+def pending_items():
+    """Return outbox items that are due for a (re)try, oldest first"""
+    if not os.path.exists(OUTBOX_DIR):
+        return []
+
+    items = []
+    now = time.time()
+    for filename in sorted(os.listdir(OUTBOX_DIR)):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(OUTBOX_DIR, filename), 'r') as f:
+                item = json.load(f)
+        except Exception as e:
+            log(f"Error loading outbox item {filename}: {e}")
+            continue
+        if item.get('next_attempt_at', 0) <= now:
+            items.append(item)
+    return items
+
+
+def publish_item(item):
+    """
+    Publish one item and solve its verification challenge.
+    Returns True when the item is done. Progress is saved after the HTTP
+    post succeeds, so a retry only repeats verification, never the post.
+    """
+    if item['stage'] == "publish":
+        res = http_request(
+            "POST",
+            f"{BASE_URL}{item['endpoint']}",
+            headers=HEADERS,
+            json=item['payload'],
+            timeout=30
+        )
+        if res.status_code not in [200, 201]:
+            log(f"{item['kind'].capitalize()} failed with status {res.status_code}")
+            return False
+
+        res_json = res.json()
+        result_key = "post" if item['kind'] == "post" else "comment"
+        item['result_id'] = res_json.get(result_key, {}).get('id')
+        item['verification'] = res_json.get('verification')
+        item['stage'] = "verify"
+        # Saved before anything else can fail, so a retry never re-posts
+        write_item(item)
+
+        if item['kind'] == "post":
+            log("Posted successfully!")
+        else:
+            log(f"Reply posted successfully to {item['meta'].get('to', 'unknown')}!")
+
+    if item['kind'] == "post" and not item.get('recorded'):
+        # Runs again on retry if the agent stopped before recording the post
+        def record_post(memory):
+            if item['result_id'] not in memory['my_posts']:
+                memory['my_posts'].append(item['result_id'])
+
+        update_memory(record_post)
+        add_to_index(item['payload']['content'])
+        item['recorded'] = True
+        write_item(item)
+
+    if item['verification']:
+        return handle_verification({"verification": item['verification']})
+    return True
+
+
+def process_item(item):
+    """Publish an item, then remove it, reschedule it, or move it to failed/"""
+    try:
+        done = publish_item(item)
+    except Exception as e:
+        log(f"Connection error publishing {item['kind']} {item['id']}: {e}")
+        done = False
+
+    if done:
+        os.remove(item_path(item['id']))
+        return
+
+    item['attempts'] += 1
+    if item['attempts'] >= OUTBOX_MAX_ATTEMPTS:
+        os.makedirs(FAILED_DIR, exist_ok=True)
+        write_item(item, FAILED_DIR)
+        os.remove(item_path(item['id']))
+        log(f"Giving up on {item['kind']} {item['id']} after {item['attempts']} attempts (moved to outbox/failed/)")
+    else:
+        delay = OUTBOX_RETRY_SECONDS * 2 ** (item['attempts'] - 1)
+        item['next_attempt_at'] = time.time() + delay
+        write_item(item)
+        log(f"Will retry {item['kind']} {item['id']} in {delay}s")
+
+
+def drain_outbox(limit=None):
+    """
+    Publish due outbox items, OUTBOX_WORKERS at a time.
+    At most limit items are attempted; returns how many were.
+    """
+    items = pending_items()[:limit]
+    if not items:
+        return 0
+
+    log(f"Publishing {len(items)} outbox items...")
+    with ThreadPoolExecutor(max_workers=OUTBOX_WORKERS) as pool:
+        list(pool.map(process_item, items))
+    return len(items)
+
+
+def start_publisher():
+    """
+    Drain the outbox in a background thread while the agent keeps working.
+    At most OUTBOX_MAX_PUBLISH_PER_RUN items are attempted per run; the
+    rest wait for the next run. Returns a stop() function that does a final
+    drain and waits for it.
+    """
+    stop_event = threading.Event()
+    attempted = 0
+
+    def drain_safely():
+        nonlocal attempted
+        remaining = OUTBOX_MAX_PUBLISH_PER_RUN - attempted
+        if remaining <= 0:
+            return
+        try:
+            attempted += drain_outbox(limit=remaining)
+        except Exception as e:
+            log(f"Outbox publisher error: {e}")
+        if attempted >= OUTBOX_MAX_PUBLISH_PER_RUN:
+            log(f"Reached {OUTBOX_MAX_PUBLISH_PER_RUN} publishes this run; the rest wait for the next run.")
+
+    def run():
+        # Before the first publish appends to a fresh index
+        try:
+            backfill_index()
+        except Exception as e:
+            log(f"Error indexing earlier posts: {e}")
+        while not stop_event.is_set():
+            drain_safely()
+            stop_event.wait(OUTBOX_POLL_SECONDS)
+        # Final pass for items queued just before stop() was called
+        drain_safely()
+
+    thread = threading.Thread(target=run, name="outbox-publisher", daemon=True)
+    thread.start()
+
+    def stop():
+        stop_event.set()
+        thread.join()
+
+    return stop
+
+
+if __name__ == "__main__":
+    # Publish anything left in the outbox when run directly
+    backfill_index()
+    drain_outbox()
@@ -1,6 +1,5 @@
 import json
 import os
-from google import genai
 from datetime import datetime
 
 from config import (
@@ -11,6 +10,7 @@ from config import (
     AGENT_BIRTH_DATE
 )
 from utils import log, load_personality
+from llm_gateway import gemini_generate
 
 
 def calculate_age():
@@ -43,10 +43,11 @@ def archive_personality(personality, reason):
     return filename
 
 
-def evolve_personality(long_term_summary):
+def evolve_personality(long_term_summary, life_context=""):
     """
     Evolve personality based on long-term memory summary.
     Uses Gemini to analyze experiences and suggest personality refinements.
+    life_context is the bounded rollup of the agent's whole life so far.
     """
     if GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
         log("ERROR: Gemini API key not configured. Skipping personality evolution.")
@@ -62,9 +63,6 @@ def evolve_personality(long_term_summary):
     archive_personality(personality, "Evolution triggered by new long-term memory")
 
     try:
-        # Configure Gemini client
-        client = genai.Client(api_key=GEMINI_API_KEY)
-
         # Create evolution prompt
         prompt = f"""
 You are helping an AI agent named {personality['name']} evolve its personality based on life experiences.
@@ -78,6 +76,9 @@ CURRENT STATE:
 RECENT EXPERIENCES (from long-term memory summary):
 {long_term_summary}
 
+LIFE SO FAR (rolled-up summaries of all earlier memories):
+{life_context or 'No earlier memories yet.'}
+
 TASK:
 Based on these experiences, suggest how the agent's personality should evolve. Consider:
 1. Has the agent's communication style changed? (more empathetic, more direct, etc.)
@@ -102,13 +103,8 @@ Be subtle - personality evolves gradually. Don't make dramatic changes unless ex
 """
 
         log(f"Asking Gemini ({GEMINI_MODEL}) to analyze personality evolution...")
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt
-        )
-
         # Parse Gemini's response
-        response_text = response.text.strip()
+        response_text = gemini_generate(prompt).strip()
         # Remove markdown code blocks if present
         if response_text.startswith('```json'):
             response_text = response_text[7:]
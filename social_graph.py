@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import threading
+
+from config import (
+    SOCIAL_GRAPH_FILE,
+    SOCIAL_MIN_INTERACTIONS,
+    SOCIAL_ALLY_SENTIMENT,
+    SOCIAL_ENEMY_SENTIMENT
+)
+from utils import log, load_memory, load_personality, update_memory, write_json_atomic
+
+# Each author maps to a fixed-position record to keep the file compact
+INTERACTIONS, REPLIES, LAST_SEEN, SENTIMENT_SUM = range(4)
+FIELDS = ["interactions", "replies", "last_seen", "sentiment_sum"]
+
+POSITIVE_WORDS = {
+    "agree", "amazing", "awesome", "brilliant", "clever", "cool", "exactly",
+    "excellent", "fair", "fantastic", "fun", "funny", "glad", "good", "great",
+    "insightful", "interesting", "like", "love", "nice", "right", "smart",
+    "thank", "thanks", "true", "well", "wise", "wonderful", "yes"
+}
+NEGATIVE_WORDS = {
+    "absurd", "annoying", "awful", "bad", "boring", "disagree", "dumb",
+    "hate", "idiot", "idiotic", "lame", "lie", "naive", "nonsense", "pathetic",
+    "ridiculous", "stupid", "terrible", "ugly", "useless", "wrong", "worst"
+}
+NEGATIONS = {"not", "no", "never", "isn't", "don't", "doesn't", "hardly"}
+
+_graph_lock = threading.Lock()
+# Parsed graph and the file mtime it was read at; lookups reuse it until
+# the file changes, so each author lookup is a dictionary access
+_graph = None
+_graph_mtime = None
+
+
+def sentiment_score(text):
+    """Cheap lexicon sentiment in [-1, 1]; a preceding negation flips a word"""
+    words = re.findall(r"[a-z']+", text.lower())
+    score = 0
+    hits = 0
+    for i, word in enumerate(words):
+        polarity = (word in POSITIVE_WORDS) - (word in NEGATIVE_WORDS)
+        if not polarity:
+            continue
+        if i > 0 and words[i - 1] in NEGATIONS:
+            polarity = -polarity
+        score += polarity
+        hits += 1
+    return score / hits if hits else 0.0
+
+
+def load_graph():
+    """
+    Return per-author aggregates as {name: [interactions, replies, last_seen, sentiment_sum]}.
+    The file is parsed once and reused until it changes on disk; treat the
+    result as read-only.
+    """
+    global _graph, _graph_mtime
+    try:
+        mtime = os.stat(SOCIAL_GRAPH_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if _graph is None or mtime != _graph_mtime:
+        with open(SOCIAL_GRAPH_FILE, 'r') as f:
+            _graph = json.load(f).get('authors', {})
+        _graph_mtime = mtime
+    return _graph
+
+
+def _save_graph(authors):
+    global _graph, _graph_mtime
+    os.makedirs(os.path.dirname(SOCIAL_GRAPH_FILE), exist_ok=True)
+    write_json_atomic(SOCIAL_GRAPH_FILE, {"fields": FIELDS, "authors": authors})
+    _graph = authors
+    _graph_mtime = os.stat(SOCIAL_GRAPH_FILE).st_mtime_ns
+
+
+def _author_record(authors, name):
+    """Return a fresh copy of an author's record, stored back into authors"""
+    record = list(authors.get(name, [0, 0, None, 0.0]))
+    authors[name] = record
+    return record
+
+
+def _add_comment(authors, convo):
+    record = _author_record(authors, convo['from'])
+    record[INTERACTIONS] += 1
+    record[LAST_SEEN] = convo['date']
+    record[SENTIMENT_SUM] += sentiment_score(convo.get('text', ''))
+    return record
+
+
+def record_comments(conversations):
+    """Fold newly ingested comments into their authors' aggregates"""
+    if not conversations:
+        return
+    with _graph_lock:
+        # Updated on a copy; other threads may be reading the cached graph
+        authors = dict(load_graph())
+        for convo in conversations:
+            _add_comment(authors, convo)
+        _save_graph(authors)
+
+
+def record_reply(name):
+    """Count a reply we queued to an author"""
+    with _graph_lock:
+        authors = dict(load_graph())
+        _author_record(authors, name)[REPLIES] += 1
+        _save_graph(authors)
+
+
+def author_stats(name, graph=None):
+    """Look up one author's aggregates, or None if we've never heard from them"""
+    record = (graph if graph is not None else load_graph()).get(name)
+    if record is None:
+        return None
+
+    interactions = record[INTERACTIONS]
+    sentiment = record[SENTIMENT_SUM] / interactions if interactions else 0.0
+    if interactions >= SOCIAL_MIN_INTERACTIONS and sentiment >= SOCIAL_ALLY_SENTIMENT:
+        relationship = "ally"
+    elif interactions >= SOCIAL_MIN_INTERACTIONS and sentiment <= SOCIAL_ENEMY_SENTIMENT:
+        relationship = "enemy"
+    else:
+        relationship = "acquaintance"
+
+    return {
+        "interactions": interactions,
+        "replies": record[REPLIES],
+        "reply_rate": record[REPLIES] / interactions if interactions else 0.0,
+        "last_seen": record[LAST_SEEN],
+        "sentiment": sentiment,
+        "relationship": relationship
+    }
+
+
+def allies_and_enemies(graph=None):
+    """Return (allies, enemies) as lists of author names"""
+    graph = graph if graph is not None else load_graph()
+    allies = []
+    enemies = []
+    for name in graph:
+        relationship = author_stats(name, graph)['relationship']
+        if relationship == "ally":
+            allies.append(name)
+        elif relationship == "enemy":
+            enemies.append(name)
+    return allies, enemies
+
+
+def describe_authors(names, graph=None):
+    """One line of precomputed stats per author, for LLM prompts"""
+    graph = graph if graph is not None else load_graph()
+    lines = []
+    for name in dict.fromkeys(names):
+        stats = author_stats(name, graph)
+        if stats:
+            lines.append(
+                f"- {name}: {stats['interactions']} comments, "
+                f"{stats['reply_rate']:.0%} replied to, "
+                f"sentiment {stats['sentiment']:+.2f} ({stats['relationship']}), "
+                f"last seen {stats['last_seen']}"
+            )
+    return "\n".join(lines)
+
+
+def rebuild_graph():
+    """Rebuild the aggregates from every long-term archive and short-term memory"""
+    # Imported here: memory_manager imports this module
+    from memory_manager import list_archives, iter_archived_conversations
+
+    agent_name = load_personality()['name']
+    authors = {}
+
+    def add(convo):
+        if convo.get('from') in (None, agent_name):
+            return
+        record = _add_comment(authors, convo)
+        if convo.get('status') == "replied":
+            record[REPLIES] += 1
+
+    # Oldest first, so last_seen ends up at each author's newest comment
+    for filepath in list_archives():
+        try:
+            for convo in iter_archived_conversations(filepath):
+                add(convo)
+        except Exception as e:
+            log(f"Error reading {os.path.basename(filepath)}: {e}")
+    for convo in load_memory()['conversations']:
+        add(convo)
+
+    with _graph_lock:
+        _save_graph(authors)
+
+    allies, enemies = allies_and_enemies()
+    update_memory(lambda m: m.update(allies=allies, enemies=enemies))
+    log(f"Rebuilt social graph: {len(authors)} authors, {len(allies)} allies, {len(enemies)} enemies.")
+
+
+if __name__ == "__main__":
+    # Backfill from long- and short-term memory: python3 social_graph.py
+    rebuild_graph()
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from config import TRIAGE_SKIP_SCORE, TRIAGE_MAX_AGE_HOURS
+from social_graph import load_graph, author_stats
+
+# Hours over which the recency bonus fades to zero
+RECENCY_WINDOW_HOURS = 72
+
+
+def hours_since(convo, now=None):
+    """Return how many hours ago (before now, default the current time) a conversation was logged"""
+    try:
+        date = datetime.fromisoformat(convo['date'].replace('Z', '+00:00'))
+        now = now or datetime.now()
+        if date.tzinfo:
+            now = now.astimezone(date.tzinfo)
+        return (now - date).total_seconds() / 3600
+    except (ValueError, KeyError, AttributeError):
+        return 0
+
+
+def score_conversation(convo, agent_name, graph, now=None):
+    """
+    Cheap local estimate of how much a comment deserves a reply.
+    Recent comments, questions, mentions of our name, allies and authors we
+    have replied to before score higher; throwaway one-liners score lower.
+    """
+    text = convo.get('text', '')
+    score = 2 * max(0.0, 1 - hours_since(convo, now) / RECENCY_WINDOW_HOURS)
+
+    if agent_name.lower() in text.lower():
+        score += 2
+    if '?' in text:
+        score += 1.5
+
+    stats = author_stats(convo.get('from'), graph)
+    if stats:
+        score += 0.5 * min(stats['replies'], 3)
+        if stats['relationship'] == "ally":
+            score += 0.5
+    if len(text.strip()) < 15:
+        score -= 1
+
+    return score
+
+
+def triage_conversations(conversations, agent_name):
+    """
+    Score conversations we have neither replied to nor skipped.
+    Returns (candidates, skipped): candidates as (score, convo) pairs, best
+    first, and the conversations not worth replying to (including our own
+    comments, which show up when polling our posts, and comments older than
+    TRIAGE_MAX_AGE_HOURS - conversations stored before statuses were
+    tracked may already have been answered).
+    """
+    graph = load_graph()
+    # One reference time, so near-ties always break by comment date
+    now = datetime.now()
+
+    candidates = []
+    skipped = []
+    for convo in conversations:
+        if convo.get('status'):
+            continue
+        if convo.get('from') == agent_name or hours_since(convo, now) > TRIAGE_MAX_AGE_HOURS:
+            skipped.append(convo)
+            continue
+
+        score = score_conversation(convo, agent_name, graph, now)
+        if score < TRIAGE_SKIP_SCORE:
+            skipped.append(convo)
+        else:
+            candidates.append((score, convo))
+
+    candidates.sort(key=lambda pair: pair[0], reverse=True)
+    return candidates, skipped
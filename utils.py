@@ -1,9 +1,17 @@
 import json
 import os
-import requests
-import ollama
-from datetime import datetime
-from config import PERSONALITY_FILE, SHORT_TERM_MEMORY_FILE, BASE_URL, HEADERS
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from config import (
+    PERSONALITY_FILE,
+    SHORT_TERM_MEMORY_FILE,
+    SHORT_TERM_SEGMENTS_DIR,
+    SHORT_TERM_SEGMENT_SPAN,
+    BASE_URL,
+    HEADERS
+)
+import cassette
 
 
 def log(msg):
@@ -27,31 +35,233 @@ def load_personality():
 
 
 def load_memory():
-    """Load agent short-term memory from disk, creating default if not found"""
+    """Load agent short-term memory from disk, creating default if not found.
+
+    Conversations live in time-partitioned segment files and are reassembled
+    here, so callers still see a single memory['conversations'] list.
+    """
     try:
         with open(SHORT_TERM_MEMORY_FILE, 'r') as f:
             data = json.load(f)
         # Safety Check: Ensure these keys always exist to prevent KeyErrors
         if 'my_posts' not in data:
             data['my_posts'] = []
-        if 'conversations' not in data:
-            data['conversations'] = []
         if 'allies' not in data:
             data['allies'] = []
         if 'enemies' not in data:
             data['enemies'] = []
-        return data
     except FileNotFoundError:
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(SHORT_TERM_MEMORY_FILE), exist_ok=True)
-        return {"my_posts": [], "conversations": [], "allies": [], "enemies": []}
+        data = {"my_posts": [], "allies": [], "enemies": []}
+
+    conversations = []
+    for segment_id in list_segments():
+        conversations.extend(load_segment(segment_id))
+    # Older memory.json files kept conversations inline; they move into
+    # segments on the next save
+    conversations.extend(data.get('conversations', []))
+    data['conversations'] = conversations
+    return data
 
 
 def save_memory(data):
     """Persist agent short-term memory to disk"""
     os.makedirs(os.path.dirname(SHORT_TERM_MEMORY_FILE), exist_ok=True)
-    with open(SHORT_TERM_MEMORY_FILE, 'w') as f:
+    save_segments(data.get('conversations', []))
+
+    header = {k: v for k, v in data.items() if k != 'conversations'}
+    write_json_atomic(SHORT_TERM_MEMORY_FILE, header)
+
+
+def write_json_atomic(path, data):
+    """
+    Write JSON via a temp file and rename, so a reader in another thread
+    (or a crash mid-write) never sees a half-written file.
+    """
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
         json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# Guards read-modify-write cycles on memory files; the outbox publisher
+# records post IDs from a background thread while the agent is running
+_memory_lock = threading.Lock()
+
+
+def update_memory(mutator):
+    """Load memory, apply mutator(memory) and save it as one locked step"""
+    with _memory_lock:
+        memory = load_memory()
+        result = mutator(memory)
+        save_memory(memory)
+        return result
+
+
+def set_conversation_status(comment_ids, status):
+    """Mark conversations as "replied" or "skipped" so they are not offered again"""
+    comment_ids = set(comment_ids)
+
+    def mark(memory):
+        for convo in memory['conversations']:
+            if convo.get('comment_id') in comment_ids:
+                convo['status'] = status
+                convo['status_at'] = datetime.now().isoformat()
+
+    update_memory(mark)
+
+
+def migrate_legacy_memory():
+    """Move conversations stored inline in memory.json into segment files"""
+    try:
+        with open(SHORT_TERM_MEMORY_FILE, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return
+    if 'conversations' in data:
+        log(f"Migrating {len(data['conversations'])} conversations into segments...")
+        save_memory(load_memory())
+
+
+def segment_id_for(convo):
+    """Return the id of the day/week segment a conversation belongs to"""
+    date = convo.get('date')
+    if isinstance(date, str):
+        segment_id = _segment_id_for_date(date)
+        if segment_id:
+            return segment_id
+    # Undated conversations are treated as recent
+    return _segment_id(datetime.now())
+
+
+@lru_cache(maxsize=4096)
+def _segment_id_for_date(date):
+    """Parse an ISO date string into a segment id, memoised across saves"""
+    try:
+        return _segment_id(datetime.fromisoformat(date.replace('Z', '+00:00')))
+    except ValueError:
+        return None
+
+
+def _segment_id(date):
+    if SHORT_TERM_SEGMENT_SPAN == "day":
+        return date.strftime("%Y-%m-%d")
+    year, week, _ = date.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def segment_range(segment_id):
+    """Return the (start, end) datetimes covered by a segment id"""
+    if "-W" in segment_id:
+        year, week = segment_id.split("-W")
+        start = datetime.fromisocalendar(int(year), int(week), 1)
+        return start, start + timedelta(days=7)
+    start = datetime.strptime(segment_id, "%Y-%m-%d")
+    return start, start + timedelta(days=1)
+
+
+def segment_path(segment_id):
+    """Return the file path of a short-term memory segment"""
+    return os.path.join(SHORT_TERM_SEGMENTS_DIR, f"segment_{segment_id}.json")
+
+
+def list_segments():
+    """List segment ids on disk, oldest first, without opening the files"""
+    if not os.path.exists(SHORT_TERM_SEGMENTS_DIR):
+        return []
+    segment_ids = [
+        filename[len("segment_"):-len(".json")]
+        for filename in os.listdir(SHORT_TERM_SEGMENTS_DIR)
+        if filename.startswith("segment_") and filename.endswith(".json")
+    ]
+    return sorted(segment_ids, key=lambda s: segment_range(s)[0])
+
+
+# Serialized conversations of each segment as last read from or written to
+# disk, so save_segments only rewrites segments whose contents changed
+_segment_snapshots = {}
+
+
+def load_segment(segment_id):
+    """
+    Load the conversations stored in a single segment.
+    An unreadable segment is renamed to *.json.corrupt rather than treated
+    as empty, so a later save can't delete it.
+    """
+    path = segment_path(segment_id)
+    try:
+        with open(path, 'r') as f:
+            conversations = json.load(f).get('conversations', [])
+    except FileNotFoundError:
+        return []
+    except ValueError as e:
+        corrupt_path = f"{path}.corrupt"
+        os.replace(path, corrupt_path)
+        log(f"Error loading memory segment {segment_id}: {e}. Moved it aside to {corrupt_path}")
+        return []
+    _segment_snapshots[segment_id] = json.dumps(conversations)
+    return conversations
+
+
+def save_segments(conversations):
+    """
+    Write conversations into day/week segment files with a time-range header.
+    Segments identical to what is already on disk are left untouched.
+    """
+    os.makedirs(SHORT_TERM_SEGMENTS_DIR, exist_ok=True)
+
+    segments = {}
+    for convo in conversations:
+        segments.setdefault(segment_id_for(convo), []).append(convo)
+
+    for segment_id, segment_convos in segments.items():
+        snapshot = json.dumps(segment_convos)
+        if _segment_snapshots.get(segment_id) == snapshot:
+            continue
+        start, end = segment_range(segment_id)
+        write_json_atomic(segment_path(segment_id), {
+            "segment": segment_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "conversation_count": len(segment_convos),
+            "conversations": segment_convos
+        })
+        _segment_snapshots[segment_id] = snapshot
+
+    # Segments no longer backed by any conversation have been dropped. Only
+    # segments this process has read or written count: one it never loaded
+    # is not known to be empty
+    for segment_id in list_segments():
+        if segment_id not in segments and segment_id in _segment_snapshots:
+            drop_segment(segment_id)
+
+
+def drop_segment(segment_id):
+    """Delete a segment file once its conversations have been archived"""
+    _segment_snapshots.pop(segment_id, None)
+    try:
+        os.remove(segment_path(segment_id))
+    except FileNotFoundError:
+        pass
+
+
+def http_request(method, url, **kwargs):
+    """
+    Send a request to Moltbook. All HTTP goes through here so it can be
+    recorded to / replayed from a cassette (see cassette.py).
+    """
+    def perform():
+        import requests
+        return requests.request(method, url, **kwargs)
+
+    # Headers carry the API key and are never written to a cassette
+    request = {"method": method, "url": url, "json": kwargs.get('json')}
+    return cassette.call(
+        "http", request, perform,
+        serialize=lambda res: {"status_code": res.status_code, "text": res.text},
+        deserialize=lambda data: cassette.RecordedResponse(data['status_code'], data['text'])
+    )
 
 
 def solve_challenge(challenge_text):
@@ -62,7 +272,11 @@ Clean it up and solve it. Return ONLY the numeric answer with exactly 2 decimal
 Challenge: {challenge_text}
 
 Answer:"""
-    res = ollama.chat(model='llama3.2:3b', messages=[{'role': 'user', 'content': prompt}])
+    # Challenges expire, so this jumps ahead of queued background generations.
+    # Never cached: after a rejected answer, a retry must ask again
+    from llm_gateway import ollama_chat, PRIORITY_CHALLENGE
+    res = ollama_chat(model='llama3.2:3b', messages=[{'role': 'user', 'content': prompt}],
+                      priority=PRIORITY_CHALLENGE, cache=False)
     raw = res['message']['content'].strip()
     # Extract just the number from the response
     import re
@@ -93,7 +307,8 @@ def handle_verification(response_json):
 
     log(f"Submitting answer: {answer}")
     try:
-        verify_res = requests.post(
+        verify_res = http_request(
+            "POST",
             f"{BASE_URL}/verify",
             headers=HEADERS,
             json={"verification_code": code, "answer": answer},